@@ -18,8 +18,6 @@ Functions:
 
 # %% ---- 2024-07-08 ------------------------
 # Requirements and constants
-from rich import print
-
 from util import logger
 from util.joint import mw
 
@@ -31,6 +29,8 @@ from util.joint import mw
 # %% ---- 2024-07-08 ------------------------
 # Play ground
 if __name__ == "__main__":
+    from rich import print
+
     mw.window.show()
 
     print(mw.children)
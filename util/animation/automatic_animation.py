@@ -18,75 +18,140 @@ Functions:
 
 # %% ---- 2024-04-19 ------------------------
 # Requirements and constants
-import time
-import contextlib
-import numpy as np
+import functools
+import collections
 
-from PIL import ImageFont, Image, ImageDraw
+from PIL import ImageFont, Image
+from PySide2 import QtCore
+from threading import Thread, Condition
 
 from ..options import rop
 from .. import logger
 
 root_path = rop.project_root
 
+# The animations allocate and drop the frames continuously,
+# keep the freed image blocks in the PIL's cache for re-using.
+# It is about 20 frames of 800 x 600.
+Image.core.set_blocks_max(20)
+
 # %% ---- 2024-04-19 ------------------------
 # Function and class
 
 
+@functools.lru_cache(maxsize=8)
+def load_font(size: int):
+    '''Load the font of the size, it is read from the disk only once for each size'''
+    return ImageFont.truetype(
+        root_path.joinpath('asset/font/MSYHL.ttc').as_posix(), size=size)
+
+
 class AutomaticAnimation(object):
     width = 800
     height = 600
 
-    font = ImageFont.truetype(
-        root_path.joinpath('asset/font/MSYHL.ttc').as_posix(),
-        size=width//20)
+    font = load_font(width//20)
 
     interval = 50  # ms, 50 ms refers 20 frames per second
+    # ! The frame is either the PIL Image or the (height, width, 3) uint8 RGB ndarray,
+    # ! the pre-rendered frames are queued as the array views without conversion.
+    # ! Convert it with the pil2rgb, it accepts the both.
     img = Image.new(mode='RGB', size=(width, height))
-    fifo_buffer = []
 
-    animating_flag = False
+    def __init__(self):
+        # The frames to be displayed, popped from the left
+        self.fifo_buffer = collections.deque()
 
-    @contextlib.contextmanager
-    def _safe_animating_flag(self):
-        try:
-            self.animating_flag = True
-            yield
-        finally:
-            self.animating_flag = False
+        # The timer runs on the Qt event loop,
+        # so the self.img is only changed in the UI thread
+        self._timer = QtCore.QTimer()
+        self._timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self._timer.setInterval(self.interval)
+        self._timer.timeout.connect(self._tick)
 
-    def animating_loop(self):
+        # The frames are made in the single persistent worker,
+        # it works on the latest submitted job
+        self._pending_job = None
+        self._job_condition = Condition()
+        Thread(target=self._working_loop, daemon=True).start()
+
+    def submit(self, func, *args):
         """
-        Perform animation by shifting the buffer.
-        It keeps going in its own path, regardless others.
+        Submit the job to the worker, it is called as func(*args).
+        The job not started yet is replaced by the new one,
+        so the worker always picks up the freshest state.
 
-        ! The process updates the self.img in its own pace,
-        ! so the UI only needs to fetch the self.img in UI's own pace.
+        Examples:
+            anim = ScoreAnimation()
+            anim.submit(anim.mk_frames, 60)
+        """
+        with self._job_condition:
+            if self._pending_job is not None:
+                logger.debug(f'Replaced the pending job: {self._pending_job}')
+            self._pending_job = (func, args)
+            self._job_condition.notify()
 
-        Args:
-            self: The ScoreAnimation instance.
+    def _working_loop(self):
+        """
+        The worker executes the latest submitted job.
+        """
+        while True:
+            with self._job_condition:
+                while self._pending_job is None:
+                    self._job_condition.wait()
+                func, args = self._pending_job
+                self._pending_job = None
+            try:
+                func(*args)
+            except Exception as err:
+                logger.error(f'Failed the job: {func}, {err}')
+
+    def start_animating(self):
+        """
+        Start the animating timer, the running timer is restarted.
 
-        Returns:
-            None
+        ! The mk_frames is called in the worker thread,
+        ! so the timer is started by the queued call in the thread it lives.
 
         Examples:
             anim = ScoreAnimation()
-            anim._animating()
+            anim.mk_frames(60)
+            anim.start_animating()
         """
+        QtCore.QMetaObject.invokeMethod(
+            self._timer, 'start', QtCore.Qt.QueuedConnection)
+        logger.debug('Start animating')
 
-        secs = self.interval / 1000
-
-        # Prevent repeated animation
-        if self.animating_flag:
-            logger.debug('Animating already on the loop')
-            return
+    def _tick(self):
+        """
+        Perform animation by shifting the buffer for one frame.
+        The timer is stopped when the buffer is empty.
 
-        with self._safe_animating_flag():
-            logger.debug('Start animating')
-            while self._shift() is not None:
-                time.sleep(secs)
+        ! The process updates the self.img in its own pace,
+        ! so the UI only needs to fetch the self.img in UI's own pace.
+        """
+        if self._shift() is None:
+            self._timer.stop()
             logger.debug('Finished animating')
 
+    def get_font(self):
+        """
+        Get the font fitting the current width.
+        """
+        return load_font(self.width//20)
+
+    def get_frame(self):
+        """
+        Get the current frame for the UI.
+
+        ! The frame is swapped by the timer in the UI thread and never drawn in-place,
+        ! so the UI gets the whole frame without the lock or copy.
+
+        Returns:
+            img (Image or np.ndarray): The current frame, read it only.
+        """
+        return self.img
+
     def _shift(self):
         """
         Shifts the score by popping an image from the stack and updating the current image.
@@ -95,7 +160,7 @@ class AutomaticAnimation(object):
             self: The ScoreAnimation instance.
 
         Returns:
-            img: The popped image from the stack, or None if the stack is empty.
+            img (Image or np.ndarray): The popped frame from the stack, or None if the stack is empty.
         """
 
         img = self._pop()
@@ -111,12 +176,10 @@ class AutomaticAnimation(object):
             self: The ScoreAnimation instance.
 
         Returns:
-            img: The popped image from the buffer, or None if the buffer is empty.
+            img (Image or np.ndarray): The popped frame from the buffer, or None if the buffer is empty.
         """
 
-        if len(self.fifo_buffer) > 0:
-            return self.fifo_buffer.pop(0)
-        return
+        return self.fifo_buffer.popleft() if self.fifo_buffer else None
 
     def _scale_x_ratio(self, x: float) -> int:
         return int(x * self.width)
@@ -128,94 +191,27 @@ class AutomaticAnimation(object):
         x, y = xy
         return (self._scale_x_ratio(x), self._scale_y_ratio(y))
 
-    def _scale_value_to_tiny_window(self, xy_array: np.ndarray, ref: float = 0.0, copy: bool = False) -> np.ndarray:
-        # The pos of the tiny window
-        # By design, the data is plotted in the y-axis linearly.
-        # The ref equals to the half_height
-        # The ratio values refer the ratios of the image
-        x_offset = 0.7
-        y_offset = 0.5
-        window_width = 0.2
-        height_of_200g = 0.2
-
-        xy_array = np.array(xy_array).astype(np.float32, copy=copy)
-
-        x_array = xy_array[:, 0]
-        x_array *= window_width
-        x_array += x_offset
-        x_array *= self.width
-
-        y_array = xy_array[:, 1]
-        y_array -= ref
-        y_array /= -200
-        y_array *= height_of_200g
-        y_array += y_offset
-        y_array *= self.height
-
-        return xy_array
-
     def tiny_window(self, ref=0, data=None, block_name='Real'):
         """
-        Creates a tiny-window widget by drawing reference and real-time curves on the given image.
+        The tiny window of the animation.
+
+        ! The curves are not drawn on the animation any more,
+        ! so it is the current frame, shared without copy.
 
         Args:
             self: The ScoreAnimation instance.
-            img: The image to draw the curves on.
             ref (int, optional): The reference value. Defaults to 0.
-            pairs (list, optional): List of value pairs. Each pair represents a point on the real-time curve. Defaults to None.
+            data (list, optional): The delayed data, kept for the callers. Defaults to None.
+            block_name (str, optional): The block name, kept for the callers. Defaults to 'Real'.
 
         Returns:
-            img: The image with the reference and real-time curves drawn.
+            img (Image or np.ndarray): The current frame, read it only.
 
         Examples:
             anim = ScoreAnimation()
-            img = Image.new('RGB', (800, 600))
-            img = anim.tiny_window(img, ref=10, pairs=[(5,), (8,), (12,)])
+            img = anim.tiny_window(ref=10, data=[(5, 1, 0), (8, 1, 1)])
         """
-
-        # ! Ignore the tiny window drawing totally
-        return self.img.copy()
-
-        # Parse the input pairs
-        # If pairs is None, only draw the ref
-        if data is None:
-            data = [(ref, 0, 0), (ref, 0, 0)]
-
-        # If pairs contain no data, only draw the ref
-        if len(data) == 0:
-            data = [(ref, 0, 0), (ref, 0, 0)]
-
-        # If pairs contain only one point, make it two
-        if len(data) == 1:
-            data.append(data[0])
-
-        data = np.array(data)
-
-        n = len(data)
-        x = np.linspace(0, 1, n)
-        avg_y = data[:, 0]
-        std_latest = data[-1, 1]
-
-        # Where the tiny window is drawn
-        img = self.img.copy()
-        draw = ImageDraw.Draw(img, mode='RGB')
-
-        # Draw the reference line
-        draw.line(self._scale_value_to_tiny_window(
-            np.array([[0, ref], [1, ref]]), ref=ref), fill='green')
-
-        if block_name != 'Hide':
-            # Draw the avg. curve
-            xy = np.concatenate(
-                [x[:, np.newaxis], avg_y[:, np.newaxis]], axis=1)
-            draw.line(self._scale_value_to_tiny_window(
-                xy, ref=ref), fill='red')
-
-            # Draw the std. range
-            draw.line(self._scale_value_to_tiny_window(
-                np.array([[1, ref-std_latest], [1, ref+std_latest]]), ref=ref), fill='gray')
-
-        return img
+        return self.get_frame()
 
 
 # %% ---- 2024-04-19 ------------------------
@@ -20,10 +20,9 @@ Functions:
 # Requirements and constants
 import numpy as np
 
-from threading import Thread
 from PIL import Image, ImageDraw
 
-from tqdm.auto import tqdm
+from tqdm import tqdm
 
 from .automatic_animation import AutomaticAnimation
 from ..options import rop
@@ -39,7 +38,7 @@ root_path = rop.project_root
 class BuildingScoreAnimation(AutomaticAnimation):
     '''
     The pipeline of the animation is append the self.buffer using images.
-    The self.gif_buffer store the animation images.
+    The self.gif_np stores the decoded gif frames.
     '''
 
     # ? --------------------------------------------------------------------------------
@@ -55,13 +54,25 @@ class BuildingScoreAnimation(AutomaticAnimation):
 
     resource_OK = False
 
+    # The decoded gif frames resized into the current size,
+    # with the score bar's outline drawn in,
+    # the score s uses the base_frames[gif_inverse[s - score_min]],
+    # the bar_strip is the filled score bar to be sliced by the score,
+    # and the size they are rendered with
+    base_frames = None
+    bar_strip = None
+    bar_xy = None
+    base_frames_size = None
+
     gif = Image.open(root_path.joinpath('asset/img/building.gif'))
     # gif = Image.open(root_path.joinpath('asset/img/giphy.gif'))
 
     def __init__(self):
         super(BuildingScoreAnimation, self).__init__()
+
         try:
-            self.gif_buffer = self.parse_gif()
+            self.parse_gif()
+            self.prepare_base_frames()
             self.resource_OK = True
             logger.info('Loaded required resource')
         except Exception as err:
@@ -71,17 +82,70 @@ class BuildingScoreAnimation(AutomaticAnimation):
         self.reset()
 
     def parse_gif(self):
-        gif_buffer = []
-
         n = self.gif.n_frames
 
-        for j in tqdm(range(100), 'Loading gif'):
-            self.gif.seek(int(j/2)+1)
-            # self.gif.seek(int(j/10))
-            gif_buffer.append(self.gif.convert('RGB'))
-        logger.debug('Parsed gif into gif_buffer')
+        # The score s displays the frame of int(s/2)+1
+        frame_idx = np.clip(
+            np.arange(self.score_min, self.score_max + 1) // 2 + 1, 0, n-1)
+        unique_idx, inverse = np.unique(frame_idx, return_inverse=True)
+
+        # Decode each frame only once
+        frames = []
+        for k in tqdm(unique_idx, 'Loading gif'):
+            self.gif.seek(int(k))
+            frames.append(np.asarray(self.gif.convert('RGB'), dtype=np.uint8))
+        self.gif_np = np.stack(frames)
+        # The frame of the score s is the self.gif_np[self.gif_inverse[s]]
+        self.gif_inverse = inverse
+        logger.debug(
+            f'Parsed gif into gif_np, {len(frames)} frames are decoded')
+
+        return self.gif_np
+
+    def _draw_score_bar(self, frames: np.ndarray):
+        '''
+        Draw the score bar's outline into the frames in-place,
+        and make the filled bar strip for the foreground.
+        The bar is axis-aligned, so it is drawn as the slices.
+        '''
+        color = (0x33, 0x11, 0x39)  # '#331139'
+
+        # The corners are inclusive as the ImageDraw.rectangle
+        x0, y0 = self.scale((0.2, 0.9))
+        x1, y1 = self.scale((0.8, 0.95))
+
+        # Draw the score bar's background, it is the outline
+        frames[:, y0, x0:x1+1] = color
+        frames[:, y1, x0:x1+1] = color
+        frames[:, y0:y1+1, x0] = color
+        frames[:, y0:y1+1, x1] = color
+
+        # The score bar's foreground, its left part is pasted by the score
+        self.bar_strip = Image.new('RGB', (x1 - x0 + 1, y1 - y0 + 1), color)
+        self.bar_xy = (x0, y0)
+
+        return frames
+
+    def prepare_base_frames(self):
+        '''
+        Resize the decoded gif frames and draw the score bar's outline.
+        Only the unique frames are kept, not the frame of every score.
+        They are re-rendered only when the resolution is changed.
+        '''
+        size = (self.width, self.height)
+
+        if self.base_frames_size == size:
+            return self.base_frames
 
-        return gif_buffer
+        # Resize each decoded frame only once
+        resized = np.stack([
+            np.asarray(Image.fromarray(e).resize(size, Image.BILINEAR))
+            for e in self.gif_np])
+        self.base_frames = self._draw_score_bar(resized)
+        self.base_frames_size = size
+        logger.debug(f'Rendered {len(self.base_frames)} base frames in {size}')
+
+        return self.base_frames
 
     def reset(self, score: int = None):
         """
@@ -101,7 +165,7 @@ class BuildingScoreAnimation(AutomaticAnimation):
         """
 
         self.score = self.score_default if score is None else score
-        self.fifo_buffer = []
+        self.fifo_buffer.clear()
 
         logger.debug(f'Score animation is reset, {self.score}, {score}')
 
@@ -109,7 +173,7 @@ class BuildingScoreAnimation(AutomaticAnimation):
 
     def pop_all(self):
         frames = list(self.fifo_buffer)
-        self.fifo_buffer = []
+        self.fifo_buffer.clear()
         return frames
 
     def safe_update_score(self, step):
@@ -128,42 +192,53 @@ class BuildingScoreAnimation(AutomaticAnimation):
         # bg = Image.new(mode='RGB', size=(
         #     self.width, self.height), color='black')
 
-        step = 1 if self.score < score else -1
-
         if self.fifo_buffer:
-            self.fifo_buffer = []
+            self.fifo_buffer.clear()
             logger.warning(
                 'The buffer is not empty, it means the animation is stopped by force')
 
-        for s in range(self.score, score + np.sign(step), step):
-            img = self.gif_buffer[s].copy()
-            img = img.resize((self.width, self.height))
+        base_frames = self.prepare_base_frames()
+
+        # Prepare the scores and their texts before the drawing
+        if score >= self.score:
+            scores = range(self.score, score + 1)
+        else:
+            scores = range(self.score, score - 1, -1)
+        texts = [f'-- 得分 {s} | {score} --' for s in scores]
+        text_xy = self.scale((0.5, 0.1))
+        font = self.get_font()
+        bar_strip = self.bar_strip
+        x0, y0 = self.bar_xy
+
+        def _render_frame(s, text):
+            img = Image.fromarray(
+                base_frames[self.gif_inverse[s - self.score_min]])
+
+            # Fill the score bar with the left slice of the bar strip
+            x, _ = self.scale((0.2 + 0.6 * s / 100, 0.95))
+            img.paste(bar_strip.crop((0, 0, x - x0 + 1, bar_strip.height)),
+                      (x0, y0))
 
             # Make the drawer as draw
-            draw = ImageDraw.Draw(img, mode='RGB')
+            draw = ImageDraw.Draw(img)
 
             # Draw the score text
             draw.text(
-                self.scale((0.5, 0.1)),
-                f'-- 得分 {s} | {score} --',
-                font=self.font,
+                text_xy,
+                text,
+                font=font,
                 anchor='ms',
                 fill='red')
 
-            # Draw the score bar's background
-            draw.rectangle(
-                (self.scale((0.2, 0.9)), self.scale((0.8, 0.95))), outline='#331139')
-
-            # Draw the score bar's foreground
-            draw.rectangle(
-                (self.scale((0.2, 0.9)), self.scale((0.2 + 0.6 * s / 100, 0.95))), fill='#331139')
+            return img
 
-            # Append to the buffer
-            self.fifo_buffer.append(img)
+        # Render serially, the font is shared and not thread-safe
+        for s, text in zip(scores, texts):
+            self.fifo_buffer.append(_render_frame(s, text))
 
         self.score = score
 
-        Thread(target=self.animating_loop, daemon=True).start()
+        self.start_animating()
 
     def scale(self, xy: tuple) -> tuple:
         return self.scale_xy_ratio(xy)
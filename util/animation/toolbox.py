@@ -25,8 +25,11 @@ import numpy as np
 # Function and class
 
 def pil2rgb(img):
-    '''Convert PIL img to RGB matrix'''
-    mat = np.array(img, dtype=np.uint8)
+    '''
+    Convert PIL img to RGB matrix, the matrix frame is returned as it is.
+    The matrix is read-only, copy it if it is required to be changed.
+    '''
+    mat = np.asarray(img, dtype=np.uint8)
     # mat = cv2.cvtColor(mat, cv2.COLOR_BGR2RGB)
     return mat
 
@@ -23,14 +23,16 @@ Functions:
 
 # %% ---- 2024-04-17 ------------------------
 # Requirements and constants
-import contextlib
+import os
+import math
 import numpy as np
 
 from PIL import Image, ImageDraw
-from threading import Thread
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 from typing import Any
-from tqdm.auto import tqdm
+from tqdm import tqdm
 
 from .automatic_animation import AutomaticAnimation
 from ..options import rop
@@ -42,6 +44,48 @@ root_path = rop.project_root
 # %% ---- 2024-04-17 ------------------------
 # Function and class
 
+def load_frames(folder: Path, n: int, image_size: tuple, name: str) -> np.ndarray:
+    '''
+    Load the frames/{j}.jpg of the folder and resize them to image_size.
+    The decoding and resizing of each frame are fused into one job of the thread pool.
+
+    Returns:
+        The frames in the contiguous array of (n, height, width, 3) uint8.
+    '''
+    width, height = image_size
+    frames = np.empty((n, height, width, 3), dtype=np.uint8)
+
+    def _load_resize(j):
+        img = Image.open(folder.joinpath(f'frames/{j}.jpg'))
+        # ! The jpeg is decoded at the smallest scale that is still larger than image_size,
+        # ! it leaves less pixels for the resize
+        img.draft('RGB', image_size)
+        # ! It is loaded only once, keep the default high quality filter
+        mat = np.asarray(img.convert('RGB').resize(image_size))
+        # ! All the frames are stacked into the same array, they must share the size
+        assert mat.shape == (height, width, 3), \
+            f'Frame {j} of {name} is {mat.shape}, expect {(height, width, 3)}'
+        frames[j] = mat
+
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        list(tqdm(
+            executor.map(_load_resize, range(n)), f'Loading frames: {name}', total=n))
+
+    logger.debug(f'Loaded {n} frames of {name}')
+    return frames
+
+
+def crop_to_bbox(img: Image) -> tuple:
+    '''
+    Crop the RGBA image to the bbox of its content.
+    Pasting the crop touches only the pixels of the content.
+
+    Returns:
+        The cropped image and the (x, y) of its upper left corner.
+    '''
+    bbox = img.getbbox() or (0, 0, *img.size)
+    return img.crop(bbox), bbox[:2]
+
 # --------------------------------------------------------------------------------
 class TwoStepScorer(object):
     ref_value = rop.yReference
@@ -58,6 +102,8 @@ class TwoStepScorer(object):
     score_2nd_range = (0, 100)
 
     def __init__(self):
+        # Keep the chain, the AutomaticAnimation is the next in the MRO
+        super(TwoStepScorer, self).__init__()
         self.reset_scores()
         logger.info("Initialized TwoStepScorer")
 
@@ -87,8 +133,7 @@ class TwoStepScorer(object):
         if len(data) == 0:
             return self.get_current_state()
 
-        mean = data[-1][0]
-        std = data[-1][1]
+        mean, std = data[-1][:2]
 
         logger.debug(f'Update score, input is mean={mean}, std={std}')
 
@@ -102,7 +147,7 @@ class TwoStepScorer(object):
             self._limit_scores()
 
             # The mean value meets the threshold, enter into the 2nd step
-            diff = np.abs(score)
+            diff = abs(score)
             if diff < self.mean_threshold:
                 self.state = '2nd'
                 self.score_2nd = 0
@@ -114,7 +159,7 @@ class TwoStepScorer(object):
         # Current state is 2nd
         # Update it with std value
         if self.state == '2nd':
-            diff = np.abs(mean - self.ref_value)
+            diff = abs(score)
 
             # --------------------
             # Check if the mean value fails to meet the threshold
@@ -145,10 +190,12 @@ class TwoStepScorer(object):
 
 
 class TwoStepScore_Animation_CatClimbsTree(TwoStepScorer, AutomaticAnimation):
-    images_2nd = []  # RGB PIL Images
-    update_score_locked = False
+    images_2nd = []  # RGB frames, (n, height, width, 3) uint8 array
     resource_OK = False
     welcome_img: Image = None
+    last_block_name = None
+    score_scale = 100  # g
+    max_d_height = 0  # pixels
 
     def __init__(self):
         super(TwoStepScore_Animation_CatClimbsTree, self).__init__()
@@ -163,8 +210,9 @@ class TwoStepScore_Animation_CatClimbsTree(TwoStepScorer, AutomaticAnimation):
             logger.error('Failed loading required resources')
 
     def reset(self):
-        self.fifo_buffer = []
+        self.fifo_buffer.clear()
         self.reset_scores()
+        self.last_block_name = None
 
     def load_cat_climbs_tree_resources(self):
         name = 'cat-climbs-tree'
@@ -182,11 +230,7 @@ class TwoStepScore_Animation_CatClimbsTree(TwoStepScorer, AutomaticAnimation):
         # Load frames
         n = 134
         # n = 6
-        self.images_2nd = []
-        for j in tqdm(range(n), f'Loading frames: {name}'):
-            img = Image.open(folder.joinpath(f'frames/{j}.jpg'))
-            self.images_2nd.append(img)
-        logger.debug(f'Loaded {n} frames of {name}')
+        self.images_2nd = load_frames(folder, n, image_size, name)
 
         # --------------------
         # Load the land image
@@ -213,10 +257,8 @@ class TwoStepScore_Animation_CatClimbsTree(TwoStepScorer, AutomaticAnimation):
         if tree_image.mode == 'RGBA':
             land_image.paste(tree_image, (0, 0), tree_image)
         else:
-            mat = np.array(tree_image.convert('L'))
-            _mat = mat.copy()
-            mat[_mat < 250] = 255
-            mat[_mat >= 250] = 0
+            mat = np.asarray(tree_image.convert('L'))
+            mat = np.where(mat < 250, 255, 0).astype(np.uint8)
             tree_mask = Image.fromarray(mat, mode='L')
             logger.debug('Generated tree image')
             land_image.paste(tree_image, (0, 0), tree_mask)
@@ -225,22 +267,9 @@ class TwoStepScore_Animation_CatClimbsTree(TwoStepScorer, AutomaticAnimation):
         # --------------------
         # Update variables
         logger.debug('Resizing resources')
-
-        def _resize(i):
-            self.images_2nd[i] = self.images_2nd[i].resize(image_size)
-
-        ts = []
-
-        for i in range(len(self.images_2nd)):
-            t = Thread(target=_resize, args=(i,), daemon=True)
-            t.start()
-            ts.append(t)
-
-        for t in ts:
-            t.join()
-
-        # self.images_2nd = [e.resize(image_size) for e in tqdm(self.images_2nd)]
         self.image_size = image_size
+        self.max_d_height = image_size[1] * 0.2
+        # The static layers are composited in the land_image once
         self.land_image = land_image.resize(image_size)
         self.tree_image = tree_image.resize(image_size)
         # self.tree_mask = tree_mask.resize(image_size)
@@ -248,43 +277,57 @@ class TwoStepScore_Animation_CatClimbsTree(TwoStepScorer, AutomaticAnimation):
         self.red_circle_image = red_circle_image.resize(image_size)
         logger.debug('Resized resources')
 
-    @contextlib.contextmanager
-    def _lock_me(self):
-        try:
-            self.update_score_locked = True
-            yield
-        finally:
-            self.update_score_locked = False
+        # --------------------
+        # Only the bbox of the circles are pasted
+        self.blue_circle_crop, self.blue_circle_xy = crop_to_bbox(
+            self.blue_circle_image)
+        red_circle_crop, red_circle_xy = crop_to_bbox(self.red_circle_image)
+
+        # --------------------
+        # The circles never move in the 2nd state,
+        # so they are baked into the frames once
+        for frame in self.images_2nd:
+            img = Image.fromarray(frame)
+            img.paste(red_circle_crop, red_circle_xy, red_circle_crop)
+            img.paste(self.blue_circle_crop,
+                      self.blue_circle_xy, self.blue_circle_crop)
+            frame[:] = np.asarray(img)
+        logger.debug('Composited circles into the frames')
 
     def update_score(self, data: Any = None, block_name: str = 'Real'):
-        if self.update_score_locked:
-            logger.warning('Update score is locked')
-            return
+        '''
+        Update the score and make the frames.
 
-        with self._lock_me():
-            # Update score within this sub-class,
-            # incase it interfaces with the animation
-            state_before = self.get_current_state()
+        ! It is called by the single worker of the animation with submit,
+        ! so the updates never overlap, and the stale ones are dropped.
+        '''
+        # Update score within this sub-class,
+        # incase it interfaces with the animation
+        state_before = self.get_current_state()
 
-            # If received no data, the state is unchanged,
-            # the state_after equals to state_before
-            state_after = state_before if data is None else self._update_score(
-                data)
+        # If received no data, the state is unchanged,
+        # the state_after equals to state_before
+        state_after = state_before if data is None else self._update_score(
+            data)
 
-            logger.debug(f'Updated state from {state_before} to {state_after}')
+        logger.debug(f'Updated state from {state_before} to {state_after}')
+
+        # The frame on the screen is already the one of the unchanged state
+        if state_after == state_before and block_name == self.last_block_name:
+            return
+        self.last_block_name = block_name
 
-            self.mk_frames(state_before, state_after, block_name)
+        self.mk_frames(state_before, state_after, block_name)
 
     def mk_frames(self, state_before, state_after, block_name='Real'):
 
         n_frames = 10
 
-        image_size = (self.width, self.height)
-
         flag_hide_block = block_name == '+'
 
         if flag_hide_block:
-            self.fifo_buffer.append(self.land_image.copy().resize(image_size))
+            # The frame is never changed, no need to copy
+            self.fifo_buffer.append(self.land_image)
 
         # --------------------
         # The 2nd state
@@ -294,17 +337,16 @@ class TwoStepScore_Animation_CatClimbsTree(TwoStepScorer, AutomaticAnimation):
             score2 = state_after['score_2nd']
             diff = score2 - score1
 
-            n = len(self.images_2nd)-1
+            images_2nd = self.images_2nd
+            n = len(images_2nd)-1
+            score_max = self.score_2nd_range[1]
 
             # Handle the both conditions of diff == 0 and diff != 0
-            for score in [score1] if diff == 0 else np.arange(score1, score2+diff/n_frames/2, diff/n_frames):
-                idx = int((n-1) * score / self.score_2nd_range[1])
-                img = self.images_2nd[idx].copy()
-                img.paste(self.red_circle_image, (0, 0), self.red_circle_image)
-                img.paste(
-                    self.blue_circle_image, (0, 0), self.blue_circle_image)
-
-                self.fifo_buffer.append(img.resize(image_size))
+            for score in [score1] if diff == 0 else (score1 + diff * j / n_frames for j in range(n_frames+1)):
+                idx = int((n-1) * score / score_max)
+                # The frame already has the circles composited in,
+                # it is queued as the ndarray view, see the AutomaticAnimation.img
+                self.fifo_buffer.append(images_2nd[idx])
 
         # --------------------
         # The 1st state
@@ -315,29 +357,29 @@ class TwoStepScore_Animation_CatClimbsTree(TwoStepScorer, AutomaticAnimation):
 
             diff = score2 - score1
 
-            score_scale = 100  # g
-            _, height = self.tree_image.size
-            max_d_height = height * 0.2
+            score_scale = self.score_scale
+            max_d_height = self.max_d_height
+            blue_circle_crop = self.blue_circle_crop
+            x, y = self.blue_circle_xy
 
             # Handle the both conditions of diff == 0 and diff != 0
-            for score in [score1] if diff == 0 else np.arange(score1, score2+diff/n_frames/2, diff/n_frames):
+            for score in [score1] if diff == 0 else (score1 + diff * j / n_frames for j in range(n_frames+1)):
+                # The land_image has the tree and red circle composited in,
+                # only the blue circle moves
                 img = self.land_image.copy()
-                # img.paste(self.tree_image, (0, 0), self.tree_mask)
 
                 # --------------------
                 # score -> infinity, dy -> 1
                 # score -> 0, dy -> 0
                 dy = -score / score_scale
-                img.paste(self.red_circle_image, (0, 0), self.red_circle_image)
                 img.paste(
-                    self.blue_circle_image,
-                    (0, int(dy * max_d_height)),
-                    self.blue_circle_image)
+                    blue_circle_crop,
+                    (x, y + int(dy * max_d_height)),
+                    blue_circle_crop)
 
-                img = img.resize(image_size)
                 self.fifo_buffer.append(img)
 
-        Thread(target=self.animating_loop, daemon=True).start()
+        self.start_animating()
 
     def scale(self, xy: tuple) -> tuple:
         return self.scale_xy_ratio(xy)
@@ -345,10 +387,12 @@ class TwoStepScore_Animation_CatClimbsTree(TwoStepScorer, AutomaticAnimation):
 
 
 class TwoStepScore_Animation_CatLeavesSubmarine(TwoStepScorer, AutomaticAnimation):
-    images_2nd = []  # RBG PIL images
-    update_score_locked = False
+    images_2nd = []  # RGB frames, (n, height, width, 3) uint8 array
     resource_OK = False
     welcome_img: Image = None
+    last_block_name = None
+    score_scale = 100  # g
+    max_d_height = 0  # pixels
 
     def __init__(self):
         super(TwoStepScore_Animation_CatLeavesSubmarine, self).__init__()
@@ -361,8 +405,9 @@ class TwoStepScore_Animation_CatLeavesSubmarine(TwoStepScorer, AutomaticAnimatio
             logger.error('Failed loading required resources')
 
     def reset(self):
-        self.fifo_buffer = []
+        self.fifo_buffer.clear()
         self.reset_scores()
+        self.last_block_name = None
 
     def load_cat_leaves_submarine_resources(self):
         name = 'cat-leaves-submarine'
@@ -379,11 +424,7 @@ class TwoStepScore_Animation_CatLeavesSubmarine(TwoStepScorer, AutomaticAnimatio
         # Load frames
         n = 136
         # n = 6
-        self.images_2nd = []
-        for j in tqdm(range(n), f'Loading frames: {name}'):
-            img = Image.open(folder.joinpath(f'frames/{j}.jpg'))
-            self.images_2nd.append(img)
-        logger.debug(f'Loaded {n} frames of {name}')
+        self.images_2nd = load_frames(folder, n, image_size, name)
 
         # --------------------
         # Load the ocean image
@@ -398,73 +439,67 @@ class TwoStepScore_Animation_CatLeavesSubmarine(TwoStepScorer, AutomaticAnimatio
 
         # --------------------
         # Create mask for the submarine
-        mat = np.array(submarine_image.convert('L'))
-        _mat = mat.copy()
-        mat[_mat < 250] = 255
-        mat[_mat >= 250] = 0
+        mat = np.asarray(submarine_image.convert('L'))
+        mat = np.where(mat < 250, 255, 0).astype(np.uint8)
         submarine_mask = Image.fromarray(mat, mode='L')
         logger.debug('Generated submarine image')
 
         # --------------------
         # Update variables
         logger.debug('Resizing resources')
-
-        def _resize(i):
-            self.images_2nd[i] = self.images_2nd[i].resize(image_size)
-
-        ts = []
-
-        for i in range(len(self.images_2nd)):
-            t = Thread(target=_resize, args=(i,), daemon=True)
-            t.start()
-            ts.append(t)
-
-        for t in ts:
-            t.join()
-
-        # self.images_2nd = [e.resize(image_size) for e in tqdm(self.images_2nd)]
         self.image_size = image_size
+        self.max_d_height = image_size[1] * 0.2
         self.ocean_image = ocean_image.resize(image_size)
         self.submarine_image = submarine_image.resize(image_size)
         self.submarine_mask = submarine_mask.resize(image_size)
         logger.debug('Resized resources')
 
-    @contextlib.contextmanager
-    def _lock_me(self):
-        try:
-            self.update_score_locked = True
-            yield
-        finally:
-            self.update_score_locked = False
+        # --------------------
+        # Only the bbox of the submarine is pasted,
+        # the alpha channel is the mask if it has
+        if self.submarine_image.mode == 'RGBA':
+            mask = self.submarine_image.getchannel('A')
+        else:
+            mask = self.submarine_mask
+        bbox = mask.getbbox() or (0, 0, *image_size)
+        self.submarine_crop = self.submarine_image.crop(bbox)
+        self.submarine_mask_crop = mask.crop(bbox)
+        self.submarine_xy = bbox[:2]
 
     def update_score(self, data: Any = None, block_name: str = 'Real'):
-        if self.update_score_locked:
-            logger.warning('Update score is locked')
-            return
+        '''
+        Update the score and make the frames.
 
-        with self._lock_me():
-            # Update score within this sub-class,
-            # incase it interfaces with the animation
-            state_before = self.get_current_state()
+        ! It is called by the single worker of the animation with submit,
+        ! so the updates never overlap, and the stale ones are dropped.
+        '''
+        # Update score within this sub-class,
+        # incase it interfaces with the animation
+        state_before = self.get_current_state()
 
-            # If received no data, the state is unchanged,
-            # the state_after equals to state_before
-            state_after = state_before if data is None else self._update_score(
-                data)
+        # If received no data, the state is unchanged,
+        # the state_after equals to state_before
+        state_after = state_before if data is None else self._update_score(
+            data)
 
-            logger.debug(f'Updated state from {state_before} to {state_after}')
-            self.mk_frames(state_before, state_after, block_name)
+        logger.debug(f'Updated state from {state_before} to {state_after}')
+
+        # The frame on the screen is already the one of the unchanged state
+        if state_after == state_before and block_name == self.last_block_name:
+            return
+        self.last_block_name = block_name
+
+        self.mk_frames(state_before, state_after, block_name)
 
     def mk_frames(self, state_before, state_after, block_name='Real'):
 
         n_frames = 10
 
-        image_size = (self.width, self.height)
-
         flag_hide_block = block_name == 'Hide'
 
         if flag_hide_block:
-            self.fifo_buffer.append(self.ocean_image.copy().resize(image_size))
+            # The frame is never changed, no need to copy
+            self.fifo_buffer.append(self.ocean_image)
 
         # --------------------
         # The 2nd state
@@ -474,13 +509,15 @@ class TwoStepScore_Animation_CatLeavesSubmarine(TwoStepScorer, AutomaticAnimatio
             score2 = state_after['score_2nd']
             diff = score2 - score1
 
-            n = len(self.images_2nd)-1
+            images_2nd = self.images_2nd
+            n = len(images_2nd)-1
+            score_max = self.score_2nd_range[1]
 
             # Handle the both conditions of diff == 0 and diff != 0
-            for score in [score1] if diff == 0 else np.arange(score1, score2+diff/n_frames/2, diff/n_frames):
-                idx = int((n-1) * score / self.score_2nd_range[1])
-                img = self.images_2nd[idx].resize(image_size)
-                self.fifo_buffer.append(img)
+            for score in [score1] if diff == 0 else (score1 + diff * j / n_frames for j in range(n_frames+1)):
+                idx = int((n-1) * score / score_max)
+                # It is queued as the ndarray view, see the AutomaticAnimation.img
+                self.fifo_buffer.append(images_2nd[idx])
 
         # --------------------
         # The 1st state
@@ -496,32 +533,27 @@ class TwoStepScore_Animation_CatLeavesSubmarine(TwoStepScorer, AutomaticAnimatio
 
             diff = score2 - score1
 
-            score_scale = 100  # g
-            _, height = self.submarine_image.size
-            max_d_height = height * 0.2
+            score_scale = self.score_scale
+            max_d_height = self.max_d_height
+            submarine_crop = self.submarine_crop
+            submarine_mask_crop = self.submarine_mask_crop
+            x, y = self.submarine_xy
 
             # Handle the both conditions of diff == 0 and diff != 0
-            for score in [score1] if diff == 0 else np.arange(score1, score2+diff/n_frames/2, diff/n_frames):
+            for score in [score1] if diff == 0 else (score1 + diff * j / n_frames for j in range(n_frames+1)):
                 img = self.ocean_image.copy()
                 # --------------------
                 # score -> infinity, dy -> 1
                 # score -> 0, dy -> 0
-                dy = (1 - np.exp(-np.abs(score / score_scale)))
-                if self.submarine_image.mode == 'RGBA':
-                    img.paste(
-                        self.submarine_image,
-                        (0, int(dy * max_d_height)),
-                        self.submarine_image)
-                else:
-                    img.paste(
-                        self.submarine_image,
-                        (0, int(dy * max_d_height)),
-                        self.submarine_mask)
-                img = img.resize(image_size)
+                dy = 1 - math.exp(-abs(score / score_scale))
+                img.paste(
+                    submarine_crop,
+                    (x, y + int(dy * max_d_height)),
+                    submarine_mask_crop)
 
                 self.fifo_buffer.append(img)
 
-        Thread(target=self.animating_loop, daemon=True).start()
+        self.start_animating()
 
     def scale(self, xy: tuple) -> tuple:
         return self.scale_xy_ratio(xy)
@@ -18,13 +18,20 @@ Functions:
 
 # %% ---- 2024-07-10 ------------------------
 # Requirements and constants
+import bisect
+
 from . import logger
 
 
 # %% ---- 2024-07-10 ------------------------
 # Function and class
 class BlockManager(object):
-    blocks = None
+    # The blocks in the parallel tuples, they are never changed after loaded
+    names = None
+    marks = None  # The marks of the names, resolved by the mark_map
+    starts = None
+    stops = None  # The stop times are increasing
+    head = 0  # The index of the current block
     total = 0
     empty_design_flag = False
 
@@ -47,17 +54,29 @@ class BlockManager(object):
             return
 
         # Parse the design to generate the offset of each blocks
-        self.blocks = []
+        names = []
+        starts = []
+        stops = []
         offset = 0
         for name, duration in design['_buffer']:
-            self.blocks.append(dict(
-                name=name,
-                start=offset,
-                stop=offset+duration
-            ))
+            names.append(name)
+            starts.append(offset)
+            stops.append(offset+duration)
             offset += duration
+        self.names = tuple(names)
+        self.marks = tuple(self.mark_map.get(name, '?') for name in names)
+        self.starts = tuple(starts)
+        self.stops = tuple(stops)
+        self.head = 0
         self.total = offset
-        logger.debug(f'Generated blocks: {self.blocks}')
+        logger.debug(
+            f'Generated blocks: {list(zip(self.names, self.starts, self.stops))}')
+
+    def current_start(self) -> float:
+        '''
+        Get the start time of the current block, it is valid only when the blocks remain.
+        '''
+        return self.starts[self.head]
 
     def consume(self, t):
         '''
@@ -79,31 +98,31 @@ class BlockManager(object):
         if self.empty_design_flag:
             return 'O', -1, -1, 1
 
+        n = len(self.stops)
+
         # Return for no blocks remained
-        if len(self.blocks) == 0:
+        if self.head >= n:
             logger.warning('No blocks remain')
             return prompts['block_empty'], 0, 0, 0
 
         # The blocks is not started yet
-        if t < self.blocks[0]['start']:
-            return 'N', self.blocks[0]["start"] - t, self.total - t
-
-        # Consume all the passed blocks
-        while t > self.blocks[0]['stop']:
-            # Drop the passed blocks
-            d = self.blocks.pop(0)
-            logger.debug(f'Dropped passed block {d}')
-            # Break if there is no block left
-            if len(self.blocks) == 0:
-                break
+        if t < self.starts[self.head]:
+            return 'N', self.starts[self.head] - t, self.total - t
+
+        # Consume all the passed blocks,
+        # the head is moved to the first block with stop >= t
+        head = bisect.bisect_left(self.stops, t, lo=self.head)
+        if head > self.head:
+            logger.debug(f'Dropped passed blocks {self.names[self.head:head]}')
+            self.head = head
 
         # Again, return for no blocks remained
-        if len(self.blocks) == 0:
+        if self.head >= n:
             logger.warning('No blocks remain')
             return prompts['block_empty'], 0, 0, 0
 
-        mark = self.mark_map.get(self.blocks[0]['name'], '?')
-        t1 = self.blocks[0]['stop'] - t
+        mark = self.marks[self.head]
+        t1 = self.stops[self.head] - t
         t2 = self.total - t
         remain_ratio = t2 / self.total
         return mark, t1, t2, remain_ratio
@@ -21,6 +21,7 @@ Functions:
 import hid
 import json
 import time
+import ctypes
 import threading
 import contextlib
 import opensimplex
@@ -43,10 +44,38 @@ def digit2int(bytes16: bytes) -> int:
     Returns:
         int: The converted integer.
     """
-    b4 = bytes16[4]
-    b3 = bytes16[3]
-    decoded = b4 * 256 + b3
-    return decoded
+    # The 3rd and 4th bytes are the little-endian integer
+    return int.from_bytes(bytes16[3:5], 'little')
+
+
+@contextlib.contextmanager
+def high_resolution_timer():
+    """Request the 1 ms scheduler granularity on Windows,
+    so the time.sleep wakes up in time.
+    It does nothing on the other platforms.
+    """
+    winmm = None
+    with contextlib.suppress(Exception):
+        winmm = ctypes.windll.winmm
+        winmm.timeBeginPeriod(1)
+    try:
+        yield
+    finally:
+        if winmm is not None:
+            winmm.timeEndPeriod(1)
+
+
+def raise_thread_priority():
+    """Raise the priority of the current thread on Windows,
+    so the reading loop is less likely to be preempted.
+    It does nothing on the other platforms.
+    """
+    THREAD_PRIORITY_HIGHEST = 2
+    with contextlib.suppress(Exception):
+        kernel32 = ctypes.windll.kernel32
+        kernel32.SetThreadPriority(
+            kernel32.GetCurrentThread(), THREAD_PRIORITY_HIGHEST)
+        logger.debug('Raised the thread priority')
 
 
 class TargetDevice(object):
@@ -72,10 +101,12 @@ class TargetDevice(object):
             device_info (dict): The device info.
         """
         try:
-            hid_devices = hid.enumerate()
-            device_info = [
-                e for e in hid_devices
-                if e['product_string'] == self.product_string][0]
+            # Stop at the first matched device
+            device_info = next((
+                e for e in hid.enumerate()
+                if e['product_string'] == self.product_string), None)
+            if device_info is None:
+                raise LookupError(f'No device of {self.product_string}')
             device = hid.device()
             logger.debug(f'Detected device: {device_info}')
         except Exception as err:
@@ -116,7 +147,8 @@ class FakePressure(object):
             f'Initialized {self.__class__} with {self.n} time points, the first is {self.buffer[0]}')
 
     def load_file(self, file):
-        data = json.load(open(file))
+        with open(file) as f:
+            data = json.load(f)
         return self.load(data)
 
     def load(self, data):
@@ -130,8 +162,10 @@ class FakePressure(object):
             logger.warning(
                 'Load FakePressure with invalid data, using default instead.')
 
+        # The rows are (pressure_value, digital_value, ...)
+        data = np.asarray(data, dtype=np.float64)
         n = len(data)
-        d = np.array([e[0] for e in data])
+        d = data[:, 0]
 
         stats = dict(
             n=n,
@@ -158,8 +192,7 @@ class FakePressure(object):
         - the 2nd value is its digital.
         '''
         d = self.buffer[self.i]
-        self.i += 1
-        self.i %= self.n
+        self.i = (self.i + 1) % self.n
         return d
 
 
@@ -186,17 +219,25 @@ class RealTimeHIDReader(object):
         The method updates the self.buffer in sample_rate frequency;
     @peek(n) (method): Peek the latest n-points data in the buffer;
 
+    ! The buffers are preallocated arrays, only the first self.n (self.n_delay) rows are valid.
+    ! The rows are never changed after written, so the peeked views are safe to read.
+
     """
 
     sample_rate = rop.idealSamplingRate  # 125 Hz
     delay_seconds = rop.delayedLength
     delay_points = int(delay_seconds * sample_rate)
 
-    g0 = rop.g0
-    g200 = rop.g200
-    offset_g0 = rop.offsetG0
+    # ! The corrections are set by the refresh_calibration() in the __init__,
+    # ! reading them here would read the correction files at import time
+    g0 = None
+    g200 = None
+    offset_g0 = None
+    calibration = (0, 1)  # (bias, k), see the refresh_calibration()
 
     use_simplex_noise_flag = True  # False
+    noise_period = 60  # seconds
+    resum_period = 10  # seconds, recompute the running sums of the delay window
     device_crush_flag = False
 
     pseudo_data = None
@@ -204,6 +245,19 @@ class RealTimeHIDReader(object):
 
     running = False
 
+    # The buffers and their valid rows
+    # ! The float64 keeps the timestamps exact in the long sessions,
+    # ! the float32 loses the millisecond resolution of the seconds after hours
+    dtype = np.float64
+    buffer = np.zeros((0, 5), dtype=dtype)
+    buffer_delay = np.zeros((0, 5), dtype=dtype)
+    n = 0
+    n_delay = 0
+
+    # The latest raw value read by the I/O thread
+    latest_raw_value = -1
+    io_error = None
+
     def __init__(self, device: TargetDevice = TargetDevice()):
         self.sample_rate = rop.idealSamplingRate  # 125 Hz
         self.delay_seconds = rop.delayedLength
@@ -214,6 +268,8 @@ class RealTimeHIDReader(object):
         self.device = device
         self.ts = 1 / self.sample_rate  # milliseconds
 
+        self.refresh_calibration()
+
         logger.info(
             f'Initialized device: {self.device} with {self.sample_rate} | {self.ts}')
 
@@ -223,11 +279,11 @@ class RealTimeHIDReader(object):
         logger.debug(
             f'Recompute delay: {self.delay_seconds} to {self.delay_points} points')
 
-    def stop(self) -> list:
+    def stop(self) -> np.ndarray:
         """Stop the collecting loop.
 
         Returns:
-            list: All the data collected.
+            np.ndarray: All the data collected.
         """
         self.running = False
 
@@ -236,9 +292,11 @@ class RealTimeHIDReader(object):
         #     pass
 
         logger.debug('Stopped the HID device reading loop.')
-        logger.debug(f'The session collected {len(self.buffer)} time points.')
+        logger.debug(f'The session collected {self.n} time points.')
 
-        return self.buffer.copy()
+        # ! The written rows are never changed, and the next start allocates new buffers,
+        # ! so the view is returned without copying
+        return self.buffer[:self.n]
 
     def start(self):
         """
@@ -250,6 +308,23 @@ class RealTimeHIDReader(object):
 
         logger.debug('Started the HID device reading loop')
 
+    def refresh_calibration(self):
+        """
+        Refresh the corrections from the rop, and compute the bias and k for the number2pressure.
+        Call it when the rop.g0, rop.g200 or rop.offsetG0 is changed.
+        """
+        self.g0 = rop.g0
+        self.g200 = rop.g200
+        self.offset_g0 = rop.offsetG0
+
+        # ! Safe divide preventing g200 == g0
+        k = 200 / max(100, self.g200 - self.g0)
+
+        # ! The tuple is replaced as a whole,
+        # ! so the reading loop never gets the bias and k of different corrections
+        self.calibration = (self.offset_g0, k)
+        logger.debug(f'Refreshed calibration: {self.calibration}')
+
     def number2pressure(self, value: int) -> float:
         """
         Convert the value to the pressure value.
@@ -265,17 +340,45 @@ class RealTimeHIDReader(object):
             float: The converted pressure value. 
         """
 
-        self.g0 = rop.g0
-        self.g200 = rop.g200
-        self.offset_g0 = rop.offsetG0
+        bias, k = self.calibration
+        return (value - bias) * k
+        # return (value - self.g0) / (self.g200 - self.g0) * 200.0
 
-        bias = self.offset_g0
+    def _mk_noise_table(self) -> np.ndarray:
+        '''
+        Make the raw values of the simplex noise for the noise_period seconds.
+        The table goes forth and back, so it loops continuously.
+        '''
+        ys = np.arange(int(self.noise_period * self.sample_rate)) * self.ts * 0.2
+        noise = opensimplex.noise2array(np.array([10.0]), ys)[:, 0]
+        raw_values = noise * 2 * 1000 + 44064 + (46112 - 44064) * 2.5  # 200g
+        return np.concatenate([raw_values, raw_values[::-1]])
 
-        # ! Safe divide preventing g200 == g0
-        k = 200 / max(100, self.g200 - self.g0)
+    def _grow(self, buffer: np.ndarray) -> np.ndarray:
+        '''
+        Grow the buffer to the double size.
+        The new buffer is used after the rows are copied, so the peek is never broken.
+        '''
+        grown = np.zeros((len(buffer) * 2, buffer.shape[1]), dtype=buffer.dtype)
+        grown[:len(buffer)] = buffer
+        logger.debug(f'Grown buffer to {len(grown)} rows')
+        return grown
 
-        return (value - bias) * k
-        # return (value - self.g0) / (self.g200 - self.g0) * 200.0
+    def _hid_reading(self, device):
+        '''
+        The I/O loop reads the device as fast as the reports come,
+        and keeps the latest raw value for the sampling loop.
+        So the USB latency never stalls the sampling loop.
+        '''
+        try:
+            while self.running:
+                # The timeout makes sure the loop checks the self.running
+                bytes16 = device.read(16, timeout_ms=100)
+                if bytes16:
+                    self.latest_raw_value = digit2int(bytes16)
+        except Exception as err:
+            self.io_error = err
+            logger.error(f'Failed reading the device: {err}')
 
     def _safe_reading(self):
         '''
@@ -291,6 +394,8 @@ class RealTimeHIDReader(object):
             traceback.print_exc()
             logger.error(f'Device crushed: {err}')
         finally:
+            # Stop the I/O thread in case of crushing
+            self.running = False
             logger.info(f'Stopped reading process')
 
     def _reading(self):
@@ -300,75 +405,135 @@ class RealTimeHIDReader(object):
         """
 
         self.running = True
+        raise_thread_priority()
 
-        self.buffer = []
-        self.buffer_delay = []
+        # Preallocate the buffers for an hour
+        capacity = int(max(self.sample_rate * 3600, 2 * self.delay_points))
+        self.buffer = np.zeros((capacity, 5), dtype=self.dtype)
+        self.buffer_delay = np.zeros((capacity, 5), dtype=self.dtype)
 
         self.n = 0
+        self.n_delay = 0
+
+        # The running sums of the (pressure_value, fake_pressure_value) in the delay window
+        delay_sum = np.zeros(2)
+        delay_sumsq = np.zeros(2)
 
         # device = self.device
-        with self.device.open_path() as device:
+        with self.device.open_path() as device, high_resolution_timer():
             valid_device_flag = device is not None
+            io_thread = None
 
             if not valid_device_flag:
                 logger.warning('Invalid device')
+                if self.use_simplex_noise_flag:
+                    noise_table = self._mk_noise_table()
+            else:
+                # Drain the stale reports queued in the HID buffer before the reading starts
+                device.set_nonblocking(1)
+                stale = 0
+                while device.read(16):
+                    stale += 1
+                device.set_nonblocking(0)
+                logger.debug(f'Drained {stale} stale reports')
+
+                # Wait for the first report, then the I/O thread keeps the latest one
+                self.io_error = None
+                self.latest_raw_value = digit2int(device.read(16))
+                io_thread = threading.Thread(
+                    target=self._hid_reading, args=(device,), daemon=True)
+                io_thread.start()
 
             logger.debug('Starts the reading loop')
 
-            tic = time.time()
-            while self.running:
-                t = time.time()
-
-                if t < (tic + self.n * self.ts):
-                    time.sleep(0.001)
-                    continue
-
-                if valid_device_flag:
-                    # ! Case: The device is valid.
-                    # Read real time pressure value and convert it
-                    bytes16 = device.read(16)
-                    raw_value = digit2int(bytes16)
-                    value = self.number2pressure(raw_value)
-                elif self.use_simplex_noise_flag:
-                    # ! Case: The device is invalid, but we use the simplex noise.
-                    # Debug usage when device is known to be invalid,
-                    # use the opensimplex noise instead of real pressure
-                    raw_value = (opensimplex.noise2(
-                        x=10, y=t * 0.2)) * 2 * 1000 + 44064 + (46112 - 44064) * 2.5  # 200g
-                    value = self.number2pressure(raw_value)
-                else:
-                    # ! Case: Otherwise, use -1, -1.
-                    # Double -1 refers the device is invalid
-                    raw_value = -1
-                    value = -1
-
-                # The 1st and 2nd elements are used as the fake pressure value
-                fake = self.fake_pressure.get()
-
-                # --------------------------------------------------------------------------------
-                # Update buffer
-                self.buffer.append((value, raw_value, fake[0], fake[1], t-tic))
-
-                # The buffer grows by 1
-                self.n += 1
-
-                # Update buffer_delay
-                if self.n > self.delay_points:
-                    pairs = self.peek(self.delay_points)
-                    values = [(e[0], e[2]) for e in pairs]
-                    avg = tuple(np.mean(values, axis=0))
-                    std = tuple(np.std(values, axis=0))
-                    timestamp = t - tic - self.delay_seconds
-                    # self.buffer_delay.append((avg, std, timestamp))
-                    self.buffer_delay.append(avg+std+(timestamp,))
-
-            t = time.time()
+            try:
+                # ! The perf_counter is monotonic and high resolution on every platform
+                tic = time.perf_counter()
+                while self.running:
+                    # Sleep until the deadline of the n-th sample
+                    delta = tic + self.n * self.ts - time.perf_counter()
+                    if delta > 0:
+                        time.sleep(delta)
+
+                    t = time.perf_counter()
+
+                    if valid_device_flag:
+                        # ! Case: The device is valid.
+                        # Get the latest pressure value from the I/O thread and convert it
+                        if self.io_error is not None:
+                            raise self.io_error
+                        raw_value = self.latest_raw_value
+                        value = self.number2pressure(raw_value)
+                    elif self.use_simplex_noise_flag:
+                        # ! Case: The device is invalid, but we use the simplex noise.
+                        # Debug usage when device is known to be invalid,
+                        # use the opensimplex noise instead of real pressure
+                        raw_value = noise_table[self.n % len(noise_table)]
+                        value = self.number2pressure(raw_value)
+                    else:
+                        # ! Case: Otherwise, use -1, -1.
+                        # Double -1 refers the device is invalid
+                        raw_value = -1
+                        value = -1
+
+                    # The 1st and 2nd elements are used as the fake pressure value
+                    fake = self.fake_pressure.get()
+
+                    # --------------------------------------------------------------------------------
+                    # Update buffer
+                    if self.n == len(self.buffer):
+                        self.buffer = self._grow(self.buffer)
+                    self.buffer[self.n] = (value, raw_value, fake[0], fake[1], t-tic)
+
+                    # The buffer grows by 1
+                    self.n += 1
+
+                    # Add the new sample into the running sums,
+                    # the stored values are used, so they are exactly removed later
+                    pair = self.buffer[self.n - 1, (0, 2)]
+                    delay_sum += pair
+                    delay_sumsq += pair * pair
+
+                    # Update buffer_delay
+                    if self.n > self.delay_points:
+                        # Remove the sample leaving the delay window,
+                        # the delay_points of 0 refers all the samples, as the peek(0) does
+                        if self.delay_points > 0:
+                            pair = self.buffer[self.n - 1 - self.delay_points, (0, 2)]
+                            delay_sum -= pair
+                            delay_sumsq -= pair * pair
+                        m = self.delay_points or self.n
+
+                        # Recompute the running sums from the window periodically,
+                        # it prevents the rounding errors from accumulating
+                        if self.n % int(self.resum_period * self.sample_rate) == 0:
+                            window = self.buffer[self.n - m:self.n][:, (0, 2)]
+                            delay_sum = window.sum(axis=0)
+                            delay_sumsq = (window * window).sum(axis=0)
+
+                        mean = delay_sum / m
+                        avg = tuple(mean)
+                        std = tuple(np.sqrt(np.maximum(delay_sumsq / m - mean * mean, 0)))
+                        timestamp = t - tic - self.delay_seconds
+                        # self.buffer_delay.append((avg, std, timestamp))
+                        if self.n_delay == len(self.buffer_delay):
+                            self.buffer_delay = self._grow(self.buffer_delay)
+                        self.buffer_delay[self.n_delay] = avg+std+(timestamp,)
+                        self.n_delay += 1
+            finally:
+                # ! Stop and join the I/O thread even if the loop raises,
+                # ! so the device is closed after the I/O thread stops reading it
+                self.running = False
+                if io_thread is not None:
+                    io_thread.join()
+
+            t = time.perf_counter()
             logger.debug(
-                f'Stopped the reading loop on {t}, lasting {t - tic} seconds.')
+                f'Stopped the reading loop on {time.time()}, lasting {t - tic} seconds.')
 
         return
 
-    def peek_by_seconds(self, sec: float, peek_delay: bool = False) -> list:
+    def peek_by_seconds(self, sec: float, peek_delay: bool = False) -> np.ndarray:
         """
         Peeks at the `n` samples from the HID device,
         where `n` is calculated based on the given number of seconds (`sec`) and the sample rate of the device.
@@ -378,13 +543,14 @@ class RealTimeHIDReader(object):
             peek_delay (bool): Whether to use the buffer_delay (True) or buffer (False).
 
         Returns:
-            list: A list of the next `n` samples from the HID device.
+            np.ndarray: The latest `n` samples from the HID device.
+                It is the view of the buffer without copying, the callers must not change it.
         """
 
         n = int(sec * self.sample_rate)
         return self.peek(n, peek_delay)
 
-    def peek(self, n: int, peek_delay: bool = False) -> list:
+    def peek(self, n: int, peek_delay: bool = False) -> np.ndarray:
         """
         Peek the latest n-points data
 
@@ -393,15 +559,24 @@ class RealTimeHIDReader(object):
             peek_delay (bool): Whether to use the buffer_delay (True) or buffer (False).
 
         Returns:
-            list:
+            np.ndarray:
                 The got data, [(value, t), ...], value is the data value, t is the timestamp.
                 If peek_delay, the buffer_delay is used, [(mean, std, max, min, timestamp), ...] is is the format.
+                It is the view of the buffer without copying, read it only.
         """
 
+        # ! Get the count before the buffer,
+        # ! the rows before the count are always written in the buffer
         if peek_delay:
-            return self.buffer_delay[-n:]
-
-        return self.buffer[-n:]
+            m = self.n_delay
+            buffer = self.buffer_delay
+        else:
+            m = self.n
+            buffer = self.buffer
+
+        # Keep the behavior of the list, n of 0 refers all the data
+        start = max(0, m - n) if n > 0 else 0
+        return buffer[start:m]
 
 # %% ---- 2024-07-10 ------------------------
 # Play ground
@@ -33,19 +33,17 @@ class FeedbackModeEnum(Enum):
     catClimbTreeFeedback = 5
 
 
+feedback_mode_info_map = {
+    FeedbackModeEnum.curveFeedback: '线条反馈',
+    FeedbackModeEnum.holdingBallFeedback: '压力球反馈',
+    FeedbackModeEnum.buildingUpFeedback: '建房子反馈',
+    FeedbackModeEnum.catOutOceanFeedback: '猫与潜水艇反馈',
+    FeedbackModeEnum.catClimbTreeFeedback: '猫爬树反馈',
+}
+
+
 def get_feedback_mode_info(exp):
-    if exp == FeedbackModeEnum.curveFeedback:
-        return '线条反馈'
-    elif exp == FeedbackModeEnum.holdingBallFeedback:
-        return '压力球反馈'
-    elif exp == FeedbackModeEnum.buildingUpFeedback:
-        return '建房子反馈'
-    elif exp == FeedbackModeEnum.catOutOceanFeedback:
-        return '猫与潜水艇反馈'
-    elif exp == FeedbackModeEnum.catClimbTreeFeedback:
-        return '猫爬树反馈'
-    else:
-        return
+    return feedback_mode_info_map.get(exp)
 
 # %% ---- 2024-07-11 ------------------------
 # Play ground
@@ -22,7 +22,8 @@ import contextlib
 import json
 from pathlib import Path
 from datetime import datetime
-from PySide2 import QtCore, QtWidgets
+from threading import Thread
+from PySide2 import QtCore, QtGui, QtWidgets
 
 from .qt.load_ui import MainWindow, app
 
@@ -44,10 +45,35 @@ from . import logger
 mw = MainWindow()
 rop._mw = mw
 
+# The widgets used over and over by the handlers, resolved once
+pushButton_start = mw.children['zcc_pushButton_start']
+pushButton_stop = mw.children['zcc_pushButton_stop']
+lineEdit_designName = mw.children['zcc_lineEdit_designName']
+lineEdit_designMaker = mw.children['zcc_lineEdit_designMaker']
+textBrowser_experimentDesign = mw.children['zcc_textBrowser_experimentDesign']
+# The design is rewritten on every edit, no need to keep the undo history
+textBrowser_experimentDesign.setUndoRedoEnabled(False)
+
+# The folders the file dialogs start from
+protocols_folder = rop.project_root.joinpath('Protocols').as_posix()
+data_folder = rop.project_root.joinpath('Data/Data').as_posix()
+
 bsa = BuildingScoreAnimation()
 tssa_cct = TwoStepScore_Animation_CatClimbsTree()
 tssa_cls = TwoStepScore_Animation_CatLeavesSubmarine()
 
+# ! The welcome screen is built once and restarted on every reuse
+wel_screen = WelcomeScreen()
+
+# The feedback mode -> (Screen, its extra kwargs)
+feedback_screen_map = {
+    FeedbackModeEnum.curveFeedback: (CurveScreen, {}),
+    FeedbackModeEnum.holdingBallFeedback: (HoldingBallScreen, {}),
+    FeedbackModeEnum.catClimbTreeFeedback: (TwoStepsScoreAnimationScreen, {'tssa': tssa_cct}),
+    FeedbackModeEnum.catOutOceanFeedback: (TwoStepsScoreAnimationScreen, {'tssa': tssa_cls}),
+    FeedbackModeEnum.buildingUpFeedback: (BuildingAnimationScreen, {'bsa': bsa}),
+}
+
 # %% ---- 2024-07-09 ------------------------
 # Function and class
 
@@ -59,15 +85,22 @@ def _load_feedback_modes():
     box_name = 'zcc_comboBox_modeSelection'
     box = mw.children[box_name]
 
-    for e in FeedbackModeEnum:
-        s = get_feedback_mode_info(e)
-        box.addItem(s, userData=e)
-        logger.debug(f'Loaded feedback mode {s}')
+    modes = list(FeedbackModeEnum)
+    labels = [get_feedback_mode_info(e) for e in modes]
+
+    # Add the items in one batch, without the per-item re-layouts
+    # ! Keep the model signals, the comboBox tracks its rows with them
+    box.view().setUpdatesEnabled(False)
+    box.addItems(labels)
+    for i, e in enumerate(modes):
+        box.setItemData(i, e, QtCore.Qt.UserRole)
+    box.view().setUpdatesEnabled(True)
+    logger.debug(f'Loaded feedback modes {labels}')
 
     def update_feedback_model():
         # Set the option with the userRole(userData)
         rop.feedback_model = box.currentData()
-        logger.debug(f'Set feedbackMode to {e}')
+        logger.debug(f'Set feedbackMode to {rop.feedback_model}')
 
     box.currentIndexChanged.connect(update_feedback_model)
 
@@ -82,29 +115,48 @@ def _bind_toggle(widget: QtWidgets.QCheckBox, attr_name: str):
     Bind the checkBox widget to the option
     '''
     # Set the widget value to the rop option
-    widget.setChecked(rop.__getattribute__(attr_name))
+    widget.setChecked(getattr(rop, attr_name))
 
     # The rop option follows the widget changing
     def _handle_change(value):
-        rop.__setattr__(attr_name, value)
-        logger.debug(f'Set {attr_name} to {value}')
+        # Skip the not changed value, e.g. the programmatic setValue
+        if getattr(rop, attr_name) == value:
+            return
+        setattr(rop, attr_name, value)
+        logger.debug('Set {} to {}', attr_name, value)
 
     widget.stateChanged.connect(_handle_change)
     logger.debug(f'Linked {attr_name} with {widget}')
 
 
-def _bind_number(widget: QtWidgets.QAbstractSpinBox, attr_name: str):
+def _bind_number(widget: QtWidgets.QAbstractSpinBox, attr_name: str, debounce_ms: int = 50):
     '''
-    Bind the number spin widget to the option
+    Bind the number spin widget to the option.
+    The bursts of changes (keystrokes, arrow repeats) are coalesced into the last value.
     '''
     # Set the widget value to the rop option
-    widget.setValue(rop.__getattribute__(attr_name))
+    widget.setValue(getattr(rop, attr_name))
+
+    # The single shot timer restarts on every change
+    timer = QtCore.QTimer(widget)
+    timer.setSingleShot(True)
+    timer.setInterval(debounce_ms)
+    pending = {}
 
     # The rop option follows the widget changing
+    def _apply_change():
+        value = pending['value']
+        # Skip the not changed value, e.g. the programmatic setValue
+        if getattr(rop, attr_name) == value:
+            return
+        setattr(rop, attr_name, value)
+        logger.debug('Set {} to {}', attr_name, value)
+
     def _handle_change(value):
-        rop.__setattr__(attr_name, value)
-        logger.debug(f'Set {attr_name} to {value}')
+        pending['value'] = value
+        timer.start()
 
+    timer.timeout.connect(_apply_change)
     widget.valueChanged.connect(_handle_change)
     logger.debug(f'linked {attr_name} with {widget}')
 
@@ -114,34 +166,60 @@ def _bind_color(widget: QtWidgets.QPushButton, attr_name: str):
     Bind the color widgets to the options.
     Its face color refers to the color.
     '''
+    style = "QPushButton {background-color: %s}"
+
     # Set the widget value to the rop option
-    widget.setStyleSheet(
-        "QPushButton {background-color: " + rop.__getattribute__(attr_name) + "}")
+    # The current color is kept, so the dialog does not parse the hex string again
+    current = {'color': QtGui.QColor(getattr(rop, attr_name))}
+    widget.setStyleSheet(style % getattr(rop, attr_name))
 
     # The rop option follows the widget changing
     def _handle_click():
-        # Get current color
-        c = rop.__getattribute__(attr_name)
         # Ask for the new color (initialized with the current color)
-        c = QtWidgets.QColorDialog().getColor(c)
+        c = QtWidgets.QColorDialog.getColor(current['color'], mw.window)
         # If the output color is valid,
         # update both the face color and option
         if c.isValid():
-            hexRgb = '#' + ''.join(
-                hex(e).replace('x', '')[-2:]
-                for e in [c.red(), c.green(), c.blue()])
-            rop.__setattr__(attr_name, hexRgb)
-            widget.setStyleSheet(
-                "QPushButton {background-color: " + hexRgb + "}")
+            # The '#rrggbb' string formatted by Qt
+            hexRgb = c.name()
+            current['color'] = c
+            setattr(rop, attr_name, hexRgb)
+            widget.setStyleSheet(style % hexRgb)
 
     widget.clicked.connect(_handle_click)
     logger.debug(f'Handled {attr_name} with {widget}')
 
 
+# The design updates inside the batch_design_updates are deferred
+_design_updates_suspended = False
+_pending_design_update = None
+
+
+@contextlib.contextmanager
+def batch_design_updates():
+    '''
+    Render the experiment design only once for the updates inside the context.
+    '''
+    global _design_updates_suspended, _pending_design_update
+    _design_updates_suspended = True
+    try:
+        yield
+    finally:
+        _design_updates_suspended = False
+        pending, _pending_design_update = _pending_design_update, None
+        if pending is not None:
+            _update_experimentDesign(*pending)
+
+
 def _update_experimentDesign(dct: dict, p: Path = None):
-    # Put the experiment design content to the textBrowser
-    textBrowser_name = 'zcc_textBrowser_experimentDesign'
+    global _pending_design_update
+
+    # Defer the update if it is inside the batch_design_updates
+    if _design_updates_suspended:
+        _pending_design_update = (dct, p)
+        return
 
+    # Put the experiment design content to the textBrowser
     # Notion if the path is valid,
     # it refers if the dct is read from a file
     try:
@@ -150,30 +228,23 @@ def _update_experimentDesign(dct: dict, p: Path = None):
             e[0] for e in p.as_posix()[:-1].split('/')) + f'/{p.name}'
 
     except Exception:
-        def _aOrB(ab):
-            a, b = ab
-            return a or b
-
         posix = 'Cached'
         short_posix = 'Cached'
         # The dct is not from a file, so update it with the current contents
-        dct['name'] = _aOrB([
-            mw.children['zcc_lineEdit_designName'].text(),
-            mw.children['zcc_lineEdit_designName'].placeholderText()
-        ])
-        dct['maker'] = _aOrB([
-            mw.children['zcc_lineEdit_designMaker'].text(),
-            mw.children['zcc_lineEdit_designMaker'].placeholderText()
-        ])
+        dct['name'] = (lineEdit_designName.text()
+                       or lineEdit_designName.placeholderText())
+        dct['maker'] = (lineEdit_designMaker.text()
+                        or lineEdit_designMaker.placeholderText())
 
     # Compute the blocks
-    total_length = 0
-    block_lines = []
-    n = len(dct['_buffer'])
-    for i, (block_name, block_length) in enumerate(dct['_buffer']):
-        block_lines.append(
-            f'[{i+1} | {n}] >> {block_name}: {block_length} seconds')
-        total_length += block_length
+    # ! Every line carries the block count n, so they are rendered together
+    buffer = dct['_buffer']
+    n = len(buffer)
+    total_length = sum(block_length for _, block_length in buffer)
+    block_lines = [
+        f'[{i+1} | {n}] >> {block_name}: {block_length} seconds'
+        for i, (block_name, block_length) in enumerate(buffer)
+    ]
 
     lines = [
         f'# Using fake pressure data: {rop.fake_file_path}',
@@ -186,9 +257,10 @@ def _update_experimentDesign(dct: dict, p: Path = None):
     ]
 
     lines.extend(block_lines)
-    mw.children[textBrowser_name].setText('\n'.join(lines))
-    logger.debug(
-        f'Updated block design to {textBrowser_name}: {dct} from {posix}')
+    # The content is plain text, skip the rich text detection of setText
+    textBrowser_experimentDesign.setPlainText('\n'.join(lines))
+    # The loguru formats the args only when the message is emitted
+    logger.debug('Updated block design: {} from {}', dct, posix)
 
     rop.design = dct
     logger.debug(f'Updated block design to {rop}')
@@ -205,14 +277,15 @@ def _handle_loading_existing_design():
 
     def _load():
         # Read the existing design
-        file, _ = QtWidgets.QFileDialog().getOpenFileName(
+        file, _ = QtWidgets.QFileDialog.getOpenFileName(
             caption='Read protocol',
-            dir=rop.project_root.joinpath('Protocols').as_posix(),
+            dir=protocols_folder,
             filter="Json files (*.json)")
         # Go on if and only if file is not empty
         if file:
             p = Path(file)
-            dct = json.load(open(p, encoding='utf-8'))
+            with open(p, encoding='utf-8') as f:
+                dct = json.load(f)
             _update_experimentDesign(dct, p)
         else:
             logger.warning('Not selecting any file')
@@ -225,30 +298,30 @@ def _handle_block_design_pushButtons():
     '''
     Handle the pushButtons for block design
     '''
-    def _add_real_block():
-        rop.design['_buffer'].append(['Real', rop.blockLength])
-        _update_experimentDesign(rop.design)
-
-    def _add_fake_block():
-        rop.design['_buffer'].append(['Fake', rop.blockLength])
-        _update_experimentDesign(rop.design)
-
-    def _add_hide_block():
-        rop.design['_buffer'].append(['Hide', rop.blockLength])
-        _update_experimentDesign(rop.design)
+    def _make_appender(kind: str):
+        '''
+        Make the handler appending the block of the kind to the design
+        '''
+        def _add_block():
+            rop.design['_buffer'].append((kind, rop.blockLength))
+            _update_experimentDesign(rop.design)
+        return _add_block
 
     def _repeat_blocks():
-        rop.design['_buffer'].extend(rop.design['_buffer'])
-        _update_experimentDesign(rop.design)
+        with batch_design_updates():
+            # Extend with the snapshot, not the list growing by itself
+            buffer = rop.design['_buffer']
+            buffer.extend(buffer[:])
+            _update_experimentDesign(rop.design)
 
     def _clear_blocks():
         rop.design['_buffer'] = []
         _update_experimentDesign(rop.design)
 
     def _save_block_design():
-        file, _ = QtWidgets.QFileDialog().getSaveFileName(
+        file, _ = QtWidgets.QFileDialog.getSaveFileName(
             caption='Save protocol',
-            dir=rop.project_root.joinpath('Protocols').as_posix(),
+            dir=protocols_folder,
             filter="Json file (*.json)")
 
         if file:
@@ -256,12 +329,9 @@ def _handle_block_design_pushButtons():
         else:
             logger.warning('Not selected any file')
 
-    mw.children['zcc_pushButton_appendRealBlock'].clicked.connect(
-        _add_real_block)
-    mw.children['zcc_pushButton_appendFakeBlock'].clicked.connect(
-        _add_fake_block)
-    mw.children['zcc_pushButton_appendHideBlock'].clicked.connect(
-        _add_hide_block)
+    for kind in ['Real', 'Fake', 'Hide']:
+        mw.children[f'zcc_pushButton_append{kind}Block'].clicked.connect(
+            _make_appender(kind))
 
     mw.children['zcc_pushButton_repeatBlocks'].clicked.connect(_repeat_blocks)
     mw.children['zcc_pushButton_clearBlocks'].clicked.connect(_clear_blocks)
@@ -273,22 +343,18 @@ def _go_back_to_welcome_screen():
     '''
     Go back to welcome screen, it is designed to be executed on the stop for experiment processing
     '''
-    pushButton_name_start = 'zcc_pushButton_start'
-    pushButton_name_stop = 'zcc_pushButton_stop'
-
     # Make a new timer
     timer = mw.stop_timer_and_get_timer()
 
     # Put the welcome screen
-    wel_screen = WelcomeScreen()
-    wel_screen.start()
+    wel_screen.restart()
     timer.timeout.connect(wel_screen.draw)
     timer.start()
     mw.change_main_screen(wel_screen)
 
     # Disable this and release start pushButton
-    mw.children[pushButton_name_start].setDisabled(True)
-    mw.children[pushButton_name_stop].setDisabled(False)
+    pushButton_start.setDisabled(True)
+    pushButton_stop.setDisabled(False)
 
     logger.debug('Went back to welcome screen')
     return
@@ -300,8 +366,7 @@ def start_experiment():
     rop.subjectAge = mw.children['zcc_spinBox_subjectAge'].value()
     rop.subjectRem = mw.children['zcc_plainTextEdit_subjectOthers'].toPlainText(
     )
-    rop.subjectExperimentDateTime = datetime.strftime(
-        datetime.now(), '%Y-%m-%d-%H-%M-%S')
+    rop.subjectExperimentDateTime = f'{datetime.now():%Y-%m-%d-%H-%M-%S}'
     if mw.children['zcc_radioButton_subjectGenderMale'].isChecked():
         rop.subjectGender = 'Male'
     else:
@@ -314,22 +379,9 @@ def start_experiment():
         {rop.subjectRem}''')
 
     # Choose a screen object
-    kwargs = {}
-    if rop.feedback_model == FeedbackModeEnum.curveFeedback:
-        Screen = CurveScreen
-    elif rop.feedback_model == FeedbackModeEnum.holdingBallFeedback:
-        Screen = HoldingBallScreen
-    elif rop.feedback_model == FeedbackModeEnum.catClimbTreeFeedback:
-        Screen = TwoStepsScoreAnimationScreen
-        kwargs['tssa'] = tssa_cct
-    elif rop.feedback_model == FeedbackModeEnum.catOutOceanFeedback:
-        Screen = TwoStepsScoreAnimationScreen
-        kwargs['tssa'] = tssa_cls
-    elif rop.feedback_model == FeedbackModeEnum.buildingUpFeedback:
-        Screen = BuildingAnimationScreen
-        kwargs['bsa'] = bsa
-    else:
-        Screen = None
+    try:
+        Screen, kwargs = feedback_screen_map[rop.feedback_model]
+    except KeyError:
         logger.error(f'Invalid feedback mode: {rop.feedback_model}')
         return
 
@@ -355,10 +407,8 @@ def start_experiment():
     mw.change_main_screen(screen)
 
     # Disable this and release stop pushButton
-    pushButton_name_start = 'zcc_pushButton_start'
-    pushButton_name_stop = 'zcc_pushButton_stop'
-    mw.children[pushButton_name_start].setDisabled(True)
-    mw.children[pushButton_name_stop].setDisabled(False)
+    pushButton_start.setDisabled(True)
+    pushButton_stop.setDisabled(False)
 
     logger.debug(f'Started experiment: {design}')
     return
@@ -369,8 +419,7 @@ def _handle_start_pushButton():
     Handle the pushButton for start block design experiment
     '''
     # Connect
-    pushButton_name_start = 'zcc_pushButton_start'
-    mw.children[pushButton_name_start].clicked.connect(start_experiment)
+    pushButton_start.clicked.connect(start_experiment)
     return
 
 
@@ -381,10 +430,8 @@ def stop_experiment():
     mw.main_screen_widget.stop()
 
     # Disable this and release start pushButton
-    pushButton_name_start = 'zcc_pushButton_start'
-    pushButton_name_stop = 'zcc_pushButton_stop'
-    mw.children[pushButton_name_stop].setDisabled(True)
-    mw.children[pushButton_name_start].setDisabled(False)
+    pushButton_stop.setDisabled(True)
+    pushButton_start.setDisabled(False)
 
     logger.debug('Stopped experiment')
 
@@ -395,10 +442,9 @@ def _handle_stop_pushButton():
     '''
 
     # Connect
-    pushButton_name_stop = 'zcc_pushButton_stop'
-    mw.children[pushButton_name_stop].clicked.connect(stop_experiment)
+    pushButton_stop.clicked.connect(stop_experiment)
     # Disable this on the app start
-    mw.children[pushButton_name_stop].setDisabled(True)
+    pushButton_stop.setDisabled(True)
 
 
 def _place_welcomeScreen_to_hBox():
@@ -406,7 +452,6 @@ def _place_welcomeScreen_to_hBox():
     Place the main screen to its place
     '''
     timer = mw.stop_timer_and_get_timer()
-    wel_screen = WelcomeScreen()
     wel_screen.start()
     timer.timeout.connect(wel_screen.draw)
     timer.start()
@@ -436,67 +481,60 @@ _load_feedback_modes()
 
 # ----------------------------------------
 # ---- Bind numbers ----
-# Display panel
-_bind_number(mw.children['zcc_doubleSpinBox_yMax'], 'yMax')
-_bind_number(mw.children['zcc_doubleSpinBox_yMin'], 'yMin')
-_bind_number(mw.children['zcc_doubleSpinBox_yReference'], 'yReference')
-_bind_number(
-    mw.children['zcc_spinBox_feedbackCurveWidth'], 'feedbackCurveWidth')
-_bind_number(
-    mw.children['zcc_spinBox_referenceCurveWidth'], 'referenceCurveWidth')
-_bind_number(
-    mw.children['zcc_spinBox_delayedCurveWidth'], 'delayedCurveWidth')
-_bind_number(
-    mw.children['zcc_doubleSpinBox_delayedLength'], 'delayedLength')
-_bind_number(
-    mw.children['zcc_doubleSpinBox_updateStepLength'], 'updateStepLength')
-_bind_number(
-    mw.children['zcc_doubleSpinBox_thresholdOfMean'], 'thresholdOfMean')
-_bind_number(
-    mw.children['zcc_doubleSpinBox_thresholdOfStd'], 'thresholdOfStd')
-
-# Block design panel
-_bind_number(
-    mw.children['zcc_spinBox_blockLength'], 'blockLength')
-_bind_number(
-    mw.children['zcc_doubleSpinBox_metricThreshold1'], 'metricThreshold1')
-_bind_number(
-    mw.children['zcc_doubleSpinBox_metricThreshold2'], 'metricThreshold2')
-_bind_number(
-    mw.children['zcc_doubleSpinBox_metricThreshold3'], 'metricThreshold3')
-_bind_number(
-    mw.children['zcc_doubleSpinBox_metricThreshold1_2'], 'metricThreshold1_2')
-_bind_number(
-    mw.children['zcc_doubleSpinBox_metricThreshold2_2'], 'metricThreshold2_2')
-_bind_number(
-    mw.children['zcc_doubleSpinBox_metricThreshold3_2'], 'metricThreshold3_2')
+# (widget name, option name)
+number_bindings = (
+    # Display panel
+    ('zcc_doubleSpinBox_yMax', 'yMax'),
+    ('zcc_doubleSpinBox_yMin', 'yMin'),
+    ('zcc_doubleSpinBox_yReference', 'yReference'),
+    ('zcc_spinBox_feedbackCurveWidth', 'feedbackCurveWidth'),
+    ('zcc_spinBox_referenceCurveWidth', 'referenceCurveWidth'),
+    ('zcc_spinBox_delayedCurveWidth', 'delayedCurveWidth'),
+    ('zcc_doubleSpinBox_delayedLength', 'delayedLength'),
+    ('zcc_doubleSpinBox_updateStepLength', 'updateStepLength'),
+    ('zcc_doubleSpinBox_thresholdOfMean', 'thresholdOfMean'),
+    ('zcc_doubleSpinBox_thresholdOfStd', 'thresholdOfStd'),
+
+    # Block design panel
+    ('zcc_spinBox_blockLength', 'blockLength'),
+    ('zcc_doubleSpinBox_metricThreshold1', 'metricThreshold1'),
+    ('zcc_doubleSpinBox_metricThreshold2', 'metricThreshold2'),
+    ('zcc_doubleSpinBox_metricThreshold3', 'metricThreshold3'),
+    ('zcc_doubleSpinBox_metricThreshold1_2', 'metricThreshold1_2'),
+    ('zcc_doubleSpinBox_metricThreshold2_2', 'metricThreshold2_2'),
+    ('zcc_doubleSpinBox_metricThreshold3_2', 'metricThreshold3_2'),
+)
+
+for widget_name, attr_name in number_bindings:
+    _bind_number(mw.children[widget_name], attr_name)
 
 
 # ----------------------------------------
 # ---- Bind colors ----
-_bind_color(
-    mw.children['zcc_pushButton_feedbackCurveColor'], 'feedbackCurveColor')
-_bind_color(
-    mw.children['zcc_pushButton_referenceCurveColor'], 'referenceCurveColor')
-_bind_color(
-    mw.children['zcc_pushButton_delayedCurveColor'], 'delayedCurveColor')
+color_bindings = (
+    ('zcc_pushButton_feedbackCurveColor', 'feedbackCurveColor'),
+    ('zcc_pushButton_referenceCurveColor', 'referenceCurveColor'),
+    ('zcc_pushButton_delayedCurveColor', 'delayedCurveColor'),
+)
+
+for widget_name, attr_name in color_bindings:
+    _bind_color(mw.children[widget_name], attr_name)
 
 
 # ----------------------------------------
 # ---- Bind toggles ----
-_bind_toggle(
-    mw.children['zcc_checkBox_flagDisplayFeedbackCurve'], 'flagDisplayFeedbackCurve')
-_bind_toggle(
-    mw.children['zcc_checkBox_flagDisplayReferenceCurve'], 'flagDisplayReferenceCurve')
-_bind_toggle(
-    mw.children['zcc_checkBox_flagDisplayDelayedCurve'], 'flagDisplayDelayedCurve')
-
-_bind_toggle(
-    mw.children['zcc_checkBox_grid'], 'flagDisplayGrid')
-_bind_toggle(
-    mw.children['zcc_checkBox_axis'], 'flagDisplayAxis')
-_bind_toggle(
-    mw.children['zcc_checkBox_marker'], 'flagDisplayMarker')
+toggle_bindings = (
+    ('zcc_checkBox_flagDisplayFeedbackCurve', 'flagDisplayFeedbackCurve'),
+    ('zcc_checkBox_flagDisplayReferenceCurve', 'flagDisplayReferenceCurve'),
+    ('zcc_checkBox_flagDisplayDelayedCurve', 'flagDisplayDelayedCurve'),
+
+    ('zcc_checkBox_grid', 'flagDisplayGrid'),
+    ('zcc_checkBox_axis', 'flagDisplayAxis'),
+    ('zcc_checkBox_marker', 'flagDisplayMarker'),
+)
+
+for widget_name, attr_name in toggle_bindings:
+    _bind_toggle(mw.children[widget_name], attr_name)
 
 # %% ---- 2024-07-09 ------------------------
 # Pending
@@ -513,6 +551,43 @@ known_key_code = {
 }
 
 
+def _on_F11_pressed():
+    # F11 is pressed, toggle full screen display
+    toggle_full_screen_display()
+    return True
+
+
+def _on_Esc_pressed():
+    # Esc is pressed, switch to normal display ONLY
+    if QtCore.Qt.WindowFullScreen & mw.window.windowState():
+        toggle_full_screen_display()
+    return False
+
+
+def _on_s_pressed():
+    # s is pressed, toggle start and stop experiment
+    try:
+        name = mw.main_screen_widget.name
+    except Exception:
+        name = 'no-named-screen'
+
+    if name == 'Experiment screen':
+        logger.debug('Stop experiment since the experiment screen is running.')
+        stop_experiment()
+    else:
+        logger.debug(f'Start experiment since the {name} is running.')
+        start_experiment()
+    return True
+
+
+# The key code -> handler table, the handler returns what the eventFilter returns
+key_press_handlers = {
+    16777274: _on_F11_pressed,
+    16777216: _on_Esc_pressed,
+    83: _on_s_pressed,
+}
+
+
 class KeyPressFilter(QtCore.QObject):
     def eventFilter(self, widget, event):
         # Return False if it is not a KeyPress
@@ -521,50 +596,12 @@ class KeyPressFilter(QtCore.QObject):
 
         # It is a KeyPress event, do something
         key_code = event.key()
-        text = event.text()
-        if event.modifiers():
-            text = event.keyCombination().key().name.decode(encoding="utf-8")
-        logger.debug(f'Key pressed: {key_code}, {text}, {event}')
-
-        # F11 is pressed, toggle full screen display
-        if known_key_code.get(key_code) == 'F11':
-            logger.debug('Got F11 pressed')
-            toggle_full_screen_display()
-
-        # Esc is pressed, exit the application
-        if known_key_code.get(key_code) == 'Esc':
-            logger.debug('Got Esc pressed')
-            # Switch to normal display ONLY
-            if QtCore.Qt.WindowFullScreen & mw.window.windowState():
-                toggle_full_screen_display()
-
-            def close_window():
-                # Method for closing the window
-                try:
-                    stop_experiment()
-                finally:
-                    app.exit()
-
-            return
+        logger.debug('Key pressed: {}, {}', key_code, known_key_code.get(key_code))
 
-        # s is pressed, toggle start and stop experiment
-        if known_key_code.get(key_code) == 's':
-            logger.debug('Got s pressed')
-            try:
-                name = mw.main_screen_widget.name
-            except Exception:
-                name = 'no-named-screen'
-            finally:
-                if name == 'Experiment screen':
-                    logger.debug(
-                        'Stop experiment since the experiment screen is running.')
-                    stop_experiment()
-                else:
-                    logger.debug(
-                        f'Start experiment since the {name} is running.')
-                    start_experiment()
-
-        return True
+        handler = key_press_handlers.get(key_code)
+        if handler is None:
+            return True
+        return handler()
 
 
 # Add event handler
@@ -574,33 +611,38 @@ mw.window.installEventFilter(eventFilter)
 
 
 def toggle_full_screen_display():
-    if QtCore.Qt.WindowFullScreen & mw.window.windowState():
-        # from showFullScreen to showNormal
-        mw.window.showNormal()
-        mw.children['zcc_leftFrame'].setVisible(True)
-        mw.children['zcc_bottomFrame'].setVisible(True)
+    # Paint once after all the changes, not on every step
+    mw.window.setUpdatesEnabled(False)
+    try:
+        if QtCore.Qt.WindowFullScreen & mw.window.windowState():
+            # from showFullScreen to showNormal
+            mw.window.showNormal()
+            mw.children['zcc_leftFrame'].setVisible(True)
+            mw.children['zcc_bottomFrame'].setVisible(True)
 
-        # Restore where the stuff were located.
-        mw.middle_frame.setGeometry(mw.middle_frame_geometry)
-        mw.main_screen_container.setGeometry(mw.main_screen_container_geometry)
+            # Restore where the stuff were located.
+            mw.middle_frame.setGeometry(mw.middle_frame_geometry)
+            mw.main_screen_container.setGeometry(mw.main_screen_container_geometry)
 
-        logger.debug('Entered show normal state')
-    else:
-        # from showNormal to showFullScreen
-        mw.window.showFullScreen()
-        mw.children['zcc_leftFrame'].setVisible(False)
-        mw.children['zcc_bottomFrame'].setVisible(False)
+            logger.debug('Entered show normal state')
+        else:
+            # from showNormal to showFullScreen
+            mw.window.showFullScreen()
+            mw.children['zcc_leftFrame'].setVisible(False)
+            mw.children['zcc_bottomFrame'].setVisible(False)
 
-        # Remember where the stuff are located.
-        mw.main_screen_container_geometry = mw.main_screen_container.geometry()
-        mw.middle_frame_geometry = mw.middle_frame.geometry()
+            # Remember where the stuff are located.
+            mw.main_screen_container_geometry = mw.main_screen_container.geometry()
+            mw.middle_frame_geometry = mw.middle_frame.geometry()
 
-        # Full screen them
-        win_geometry = mw.window.geometry()
-        mw.middle_frame.setGeometry(win_geometry)
-        mw.main_screen_container.setGeometry(win_geometry)
+            # Full screen them
+            win_geometry = mw.window.geometry()
+            mw.middle_frame.setGeometry(win_geometry)
+            mw.main_screen_container.setGeometry(win_geometry)
 
-        logger.debug('Entered show full screen state')
+            logger.debug('Entered show full screen state')
+    finally:
+        mw.window.setUpdatesEnabled(True)
 
 
 mw.children['zcc_pushButton_toggleFullScreen'].clicked.connect(
@@ -609,11 +651,45 @@ mw.children['zcc_pushButton_toggleFullScreen'].clicked.connect(
 # %%
 
 
+class ReplayLoader(QtCore.QObject):
+    '''
+    Load the replay data in the thread, so the UI is not blocked by the large file.
+    The replay screen is put in the UI thread, when the data is loaded.
+    '''
+    loaded = QtCore.Signal(object, object)
+
+    def __init__(self):
+        super().__init__()
+        # ! The slot belongs to the QObject in the UI thread,
+        # ! so the signal emitted in the loading thread is queued into the UI thread
+        self.loaded.connect(self._on_loaded)
+
+    def load(self, path: Path):
+        def _load():
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except Exception as err:
+                logger.error(f'Failed loading replay data: {path}, {err}')
+                return
+            self.loaded.emit(data, path)
+
+        Thread(target=_load, daemon=True).start()
+        logger.debug(f'Loading replay data: {path}')
+
+    @QtCore.Slot(object, object)
+    def _on_loaded(self, data, path: Path):
+        _put_replay_screen(data, path)
+
+
+replay_loader = ReplayLoader()
+
+
 def _on_click_playback_button():
     # Read the existing data
-    file, _ = QtWidgets.QFileDialog().getOpenFileName(
+    file, _ = QtWidgets.QFileDialog.getOpenFileName(
         caption='Read protocol',
-        dir=rop.project_root.joinpath('Data/Data').as_posix(),
+        dir=data_folder,
         filter="Json files (*.json)")
 
     # Go on only when the file is not empty
@@ -621,9 +697,10 @@ def _on_click_playback_button():
         logger.warning('Not selecting any file')
         return
 
-    path = Path(file)
-    data = json.load(open(path))
+    replay_loader.load(Path(file))
+
 
+def _put_replay_screen(data, path: Path):
     # Make a new timer
     timer = mw.stop_timer_and_get_timer()
 
@@ -635,10 +712,8 @@ def _on_click_playback_button():
     mw.change_main_screen(screen)
 
     # Disable stop pushButton and release start pushButton
-    pushButton_name_start = 'zcc_pushButton_start'
-    pushButton_name_stop = 'zcc_pushButton_stop'
-    mw.children[pushButton_name_stop].setDisabled(True)
-    mw.children[pushButton_name_start].setDisabled(False)
+    pushButton_stop.setDisabled(True)
+    pushButton_start.setDisabled(False)
 
 
 mw.children['zcc_pushButton_replayCurve'].clicked.connect(
@@ -649,9 +724,9 @@ mw.children['zcc_pushButton_replayCurve'].clicked.connect(
 
 def _on_click_load_fake_feedback_data_button():
     # Read the existing data
-    file, _ = QtWidgets.QFileDialog().getOpenFileName(
+    file, _ = QtWidgets.QFileDialog.getOpenFileName(
         caption='Read protocol',
-        dir=rop.project_root.joinpath('Data/Data').as_posix(),
+        dir=data_folder,
         filter="Json files (*.json)")
 
     # Go on only when the file is not empty
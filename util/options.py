@@ -16,10 +16,12 @@ Functions:
 """
 
 
+import os
 import contextlib
 # %% ---- 2024-07-09 ------------------------
 # Requirements and constants
-from threading import Thread
+from threading import Thread, Condition, Lock
+from functools import cached_property
 
 from .feedback_mode_enum import FeedbackModeEnum
 from . import logger, project_name, software_version, project_root
@@ -29,12 +31,21 @@ from . import logger, project_name, software_version, project_root
 # Function and class
 class Singleton(type):
     _instances = {}
+    _lock = Lock()
 
     def __call__(cls, *args, **kwargs):
-        if cls not in cls._instances:
-            cls._instances[cls] = super(
-                Singleton, cls).__call__(*args, **kwargs)
-        return cls._instances[cls]
+        # The fast path, the instance exists
+        instance = cls._instances.get(cls)
+        if instance is not None:
+            return instance
+
+        # ! Check again in the lock, so only one thread creates the instance
+        with cls._lock:
+            instance = cls._instances.get(cls)
+            if instance is None:
+                instance = super(Singleton, cls).__call__(*args, **kwargs)
+                cls._instances[cls] = instance
+        return instance
 
 
 class RunningOptions(object, metaclass=Singleton):
@@ -92,7 +103,8 @@ class RunningOptions(object, metaclass=Singleton):
 
     # Block design
     blockLength = 10  # seconds
-    design = {"name": "N.A.", "maker": "N.A.", "_buffer": []}
+    # ! The design is created in the __init__, the class does not share its _buffer
+    design = None
 
     # Metrics settings
     metricThreshold1 = 0
@@ -112,10 +124,7 @@ class RunningOptions(object, metaclass=Singleton):
     # ! Device name, ask the product if the device changes
     productString = 'HIDtoUART example'
 
-    # Corrections settings
-    g0 = int(open(project_root.joinpath('correction/g0')).read())
-    g200 = int(open(project_root.joinpath('correction/g200')).read())
-    offsetG0 = int(open(project_root.joinpath('correction/offset_g0')).read())
+    # Corrections settings, see the g0, g200 and offsetG0 properties
 
     # Pseudo setting
     fake_file_path = None
@@ -123,25 +132,76 @@ class RunningOptions(object, metaclass=Singleton):
     # Education mode flag
     education_mode_flag = False
 
+    def read_correction(self, name):
+        '''
+        Read the correction number from the file of the name.
+        '''
+        return int(project_root.joinpath('correction', name).read_text())
+
+    # ! The corrections are read on the first access,
+    # ! assigning them (rop.g0 = ...) overrides the cached values.
+    @cached_property
+    def g0(self):
+        return self.read_correction('g0')
+
+    @cached_property
+    def g200(self):
+        return self.read_correction('g200')
+
+    @cached_property
+    def offsetG0(self):
+        return self.read_correction('offset_g0')
+
+    def __init__(self):
+        # The block design, the _buffer is the list of (block name, block length)
+        self.design = {"name": "N.A.", "maker": "N.A.", "_buffer": []}
+
+        # The corrections waiting for writing, {name: num}
+        self._pending_corrections = {}
+        self._correction_condition = Condition()
+        Thread(target=self._correction_writing_loop, daemon=True).start()
+
     def write_correction(self, name, num):
-        def _write():
-            dst = project_root.joinpath('correction', name)
-            with open(dst, 'w') as f:
-                f.write(f'{num}')
-            logger.debug(f'Write {num} to {dst}')
-        Thread(target=_write, daemon=True).start()
+        '''
+        Write the correction number to the file of the name in the writer thread.
+        The pending number of the same name is replaced, so only the latest one is written.
+        '''
+        with self._correction_condition:
+            self._pending_corrections[name] = num
+            self._correction_condition.notify()
+
+    def _correction_writing_loop(self):
+        '''
+        The writer writes the pending corrections.
+        ! The file is written to a temporary file and then replaced,
+        ! so it is never left half written.
+        '''
+        while True:
+            with self._correction_condition:
+                while not self._pending_corrections:
+                    self._correction_condition.wait()
+                pending = self._pending_corrections
+                self._pending_corrections = {}
+
+            for name, num in pending.items():
+                dst = project_root.joinpath('correction', name)
+                tmp = dst.with_suffix('.tmp')
+                try:
+                    with open(tmp, 'w') as f:
+                        f.write(f'{num}')
+                    os.replace(tmp, dst)
+                    logger.debug(f'Write {num} to {dst}')
+                except Exception as err:
+                    logger.error(f'Failed to write {num} to {dst}, {err}')
 
     def read_metric_ranges_prompt(self):
         folder = project_root.joinpath('asset/prompts')
-        with contextlib.suppress(Exception):
-            self.metricRange1Prompt = open(folder.joinpath(
-                'metric range1 prompt.txt'), 'r', encoding='utf8').read().strip()
-        with contextlib.suppress(Exception):
-            self.metricRange2Prompt = open(folder.joinpath(
-                'metric range2 prompt.txt'), 'r', encoding='utf8').read().strip()
-        with contextlib.suppress(Exception):
-            self.metricRange3Prompt = open(folder.joinpath(
-                'metric range3 prompt.txt'), 'r', encoding='utf8').read().strip()
+        for i in [1, 2, 3]:
+            # Keep the default prompt if the file is not readable
+            with contextlib.suppress(Exception):
+                path = folder.joinpath(f'metric range{i} prompt.txt')
+                setattr(self, f'metricRange{i}Prompt',
+                        path.read_text(encoding='utf8').strip())
         logger.debug('Read metric ranges prompt: {}'.format([
             self.metricRange1Prompt,
             self.metricRange2Prompt,
@@ -18,12 +18,13 @@ Functions:
 
 # %% ---- 2024-07-11 ------------------------
 # Requirements and constants
-import scipy
+import os
 import json
 import numpy as np
 import pyqtgraph as pg
 
-from PySide2 import QtWidgets
+from threading import Thread
+from PySide2 import QtCore, QtWidgets
 
 from ..options import rop
 from ..block_manager import BlockManager
@@ -34,6 +35,33 @@ from .. import logger
 
 # %% ---- 2024-07-11 ------------------------
 # Function and class
+class SavingReporter(QtCore.QObject):
+    '''
+    Report the saved data in the dialog.
+    The data is saved in the thread, and the dialog is shown in the UI thread.
+    '''
+    saved = QtCore.Signal(str)
+
+    def __init__(self):
+        super().__init__()
+        # ! The slot belongs to the QObject in the UI thread,
+        # ! so the signal emitted in the saving thread is queued into the UI thread
+        self.saved.connect(self._on_saved)
+
+    @QtCore.Slot(str)
+    def _on_saved(self, content: str):
+        dialog = QtWidgets.QDialog()
+        dialog.setWindowTitle('Saved data')
+        layout = QtWidgets.QVBoxLayout()
+        text_browser = QtWidgets.QTextBrowser(parent=dialog)
+        text_browser.setText(content)
+        layout.addWidget(text_browser)
+        dialog.setLayout(layout)
+        dialog.resize(600, 600)
+        dialog.exec_()
+
+
+saving_reporter = SavingReporter()
 
 
 class BaseExperimentScreen(pg.PlotWidget):
@@ -143,7 +171,7 @@ class BaseExperimentScreen(pg.PlotWidget):
         data = realign_into_8ms_sampling(data)
 
         # Get mark
-        passed = data[-1][-1]
+        passed = data[-1, -1]
         mark, _, _, _ = self.bm.consume(passed)
         # E refers experiment ends property
         # others refer it is stopped by force
@@ -166,32 +194,41 @@ class BaseExperimentScreen(pg.PlotWidget):
             paths = []
             encoding = 'gbk'
 
+            def write_text(path, text):
+                # ! Write the temporary file and then replace,
+                # ! so the file is never left half written
+                tmp = path.with_suffix('.tmp')
+                tmp.write_text(text, encoding=encoding)
+                os.replace(tmp, path)
+
             # 1. Save data
             folder = save_path.joinpath('Data')
             path = folder.joinpath(f'{filename_stem}.json')
             path.parent.mkdir(exist_ok=True, parents=True)
-            json.dump(data, open(path, 'w', encoding=encoding))
+            # ! Keep the json format, the replay and fake feedback read it.
+            # ! Encode it in one C call and write it at once
+            write_text(path, json.dumps(data.tolist()))
             paths.append(path)
 
             # 2. Save subject
             folder = save_path.joinpath('Subject')
             path = folder.joinpath(f'{filename_stem}.txt')
             path.parent.mkdir(exist_ok=True, parents=True)
-            print(subject_info, file=open(path, 'w', encoding=encoding))
+            write_text(path, f'{subject_info}\n')
             paths.append(path)
 
             # 3. Save status
             folder = save_path.joinpath('Status')
             path = folder.joinpath(f'{filename_stem}.txt')
             path.parent.mkdir(exist_ok=True, parents=True)
-            print(status, file=open(path, 'w', encoding=encoding))
+            write_text(path, f'{status}\n')
             paths.append(path)
 
             # 4. Save experiment
             folder = save_path.joinpath('Experiment')
             path = folder.joinpath(f'{filename_stem}.txt')
             path.parent.mkdir(exist_ok=True, parents=True)
-            print(self.design, file=open(path, 'w', encoding=encoding))
+            write_text(path, f'{self.design}\n')
             paths.append(path)
 
             # 5. The score and thresholds
@@ -203,11 +240,6 @@ class BaseExperimentScreen(pg.PlotWidget):
             # Report
             logger.debug(f'Saved data and others into {paths}')
 
-            dialog = QtWidgets.QDialog()
-            dialog.setWindowTitle('Saved data')
-            layout = QtWidgets.QVBoxLayout()
-            text_browser = QtWidgets.QTextBrowser(parent=dialog)
-
             # ----------------------------------------
             # ---- Generate output prompt ----
             score_content = '\n'.join([
@@ -231,17 +263,21 @@ class BaseExperimentScreen(pg.PlotWidget):
             content = '\n----------------------------------------\n'.join(
                 [score_content, prompt_content, saving_content])
 
-            text_browser.setText(content)
-            layout.addWidget(text_browser)
-            dialog.setLayout(layout)
-            dialog.resize(600, 600)
-            dialog.exec_()
+            saving_reporter.saved.emit(content)
+
+        def _save_data():
+            try:
+                save_data()
+            except Exception as err:
+                logger.error(f'Failed saving data: {err}')
 
         if rop.education_mode_flag:
             logger.warning(
                 'Experiment stops, but the data is not saved since education_mode_flag is set')
         else:
-            save_data()
+            # Save in the thread, the UI is not blocked by the writing.
+            # ! It is not daemon, so the interpreter waits for the writing on exit
+            Thread(target=_save_data, daemon=False).start()
 
         # Execute the on_stop function
         try:
@@ -255,53 +291,36 @@ class BaseExperimentScreen(pg.PlotWidget):
 
         logger.debug(f'Finished: {self.design}')
 
-    def _correction_0g(self):
+    def _correct(self, corrections: dict):
+        """
+        Correct the options with the mean digital value of the latest 100 points.
+
+        Args:
+            corrections (dict): {option name: correction file name}, e.g. {'g200': 'g200'}.
+        """
         pairs = self.HID_reader.peek(100)
         n = len(pairs)
         if n == 0:
             logger.warning(
-                "Failed to correct with the 0 g, since the data is empty")
+                f"Failed to correct the {list(corrections)}, since the data is empty")
             return
-        g0 = int(sum(e[1] for e in pairs) / n)
-        rop.g0 = g0
-        rop.offsetG0 = g0
-        logger.debug(f"Re-correct the g0 to {g0} (with {n} points)")
-        logger.debug(f"Re-correct the offset_g0 to {g0} (with {n} points)")
-        # Write correction
-        rop.write_correction('g0', g0)
-        rop.write_correction('offset_g0', g0)
+        value = int(pairs[:, 1].mean(dtype=np.float64))
+        for attr, name in corrections.items():
+            setattr(rop, attr, value)
+            logger.debug(f"Re-correct the {name} to {value} (with {n} points)")
+            # Write correction
+            rop.write_correction(name, value)
+        self.HID_reader.refresh_calibration()
         return
 
+    def _correction_0g(self):
+        self._correct({'g0': 'g0', 'offsetG0': 'offset_g0'})
+
     def _correction_200g(self):
-        pairs = self.HID_reader.peek(100)
-        n = len(pairs)
-        if n == 0:
-            logger.warning(
-                "Failed to correct with the 200 g, since the data is empty"
-            )
-            return
-        g200 = int(sum(e[1] for e in pairs) / n)
-        rop.g200 = g200
-        logger.debug(f"Re-correct the g200 to {g200} (with {n} points)")
-        # Write correction
-        rop.write_correction('g200', g200)
-        return
+        self._correct({'g200': 'g200'})
 
     def _correction_offset_0g(self):
-        pairs = self.HID_reader.peek(100)
-        n = len(pairs)
-        if n == 0:
-            logger.warning(
-                "Failed to correct with the offset 0 g, since the data is empty"
-            )
-            return
-        offset_g0 = int(sum(e[1] for e in pairs) / n)
-        rop.offsetG0 = offset_g0
-        logger.debug(
-            f"Re-correct the offset_g0 to {offset_g0} (with {n} points)")
-        # Write correction
-        rop.write_correction('offset_g0', offset_g0)
-        return
+        self._correct({'offsetG0': 'offset_g0'})
 
 
 def realign_into_8ms_sampling(data: list) -> np.ndarray:
@@ -309,23 +328,27 @@ def realign_into_8ms_sampling(data: list) -> np.ndarray:
     Re-aligns the given data to 8 milliseconds sampling.
 
     Args:
-        data (list): The input data to be re-aligned.
+        data (list or np.ndarray): The input data to be re-aligned.
 
     Returns:
         np.ndarray: The re-aligned data with columns (pressure_value, digital_value, fake_pressure_value, fake_digital_value, seconds passed from the start).
     """
     # Make sure the sampling time is strictly increasing sequence
-    # 1. Unique values
-    m = len(data)
-    d = [data[0]]
-    for i in range(1, m):
-        if data[i][-1] != d[-1][-1]:
-            d.append(data[i])
-    data = d
+    # 1. Make it increasing, the stable sort keeps the first of the same times
+    data = np.asarray(data, dtype=np.float64).reshape(-1, 5)
+    data = data[np.argsort(data[:, 4], kind='stable')]
+
+    # 2. Unique values
+    keep = np.empty(len(data), dtype=bool)
+    keep[:1] = True
+    np.not_equal(data[1:, 4], data[:-1, 4], out=keep[1:])
+    data = data[keep]
     m = len(data)
 
-    # 2. Make it increasing
-    data = np.array(sorted(data, key=lambda e: e[-1]))
+    # There is nothing to interpolate between with less than 2 samples
+    if m < 2:
+        logger.warning(f'Not realigned the data with {m} points')
+        return data
 
     # ! Columns of data is
     # ! (pressure_value, digital_value, fake_pressure_value, fake_digital_value,seconds passed from the start)
@@ -342,18 +365,16 @@ def realign_into_8ms_sampling(data: list) -> np.ndarray:
     realigned = np.zeros((n, 5))
     realigned[:, 4] = x_realign
 
-    # 3. Setup the interoplate class as worker
-    worker = scipy.interpolate.CubicSpline
-
-    # 4. Interploate the other columns
-    for i in range(4):
-        interpolator = worker(x=x_sampling, y=data[:, i])
-        realigned[:, i] = interpolator(x_realign)
+    # 3. Interploate the other columns
+    # ! The samples are as dense as the 8 ms grid,
+    # ! so the linear interpolation is as good as the cubic spline
+    for k in range(4):
+        realigned[:, k] = np.interp(x_realign, x_sampling, data[:, k])
 
     logger.debug(
-        f'Realigned the data with {m} -> {n} points, interpolator is {worker}')
+        f'Realigned the data with {m} -> {n} points, linear interpolation')
 
-    return realigned.tolist()
+    return realigned
 # %% ---- 2024-07-11 ------------------------
 # Play ground
 
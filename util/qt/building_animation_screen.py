@@ -21,7 +21,6 @@ Functions:
 import numpy as np
 import pyqtgraph as pg
 
-from threading import Thread
 from PySide2.QtGui import QFont
 
 from .base_experiment_screen import BaseExperimentScreen
@@ -106,12 +105,12 @@ class BuildingAnimationScreen(BaseExperimentScreen):
 
         # Get data
         data = self.HID_reader.peek_by_seconds(peek_length, peek_delay=False)
-        data = np.array(data)
+        data = np.asarray(data)
 
         # Get delayed_data
         delayed_data = self.HID_reader.peek_by_seconds(
             peek_length, peek_delay=True)
-        delayed_data = np.array(delayed_data)
+        delayed_data = np.asarray(delayed_data)
 
         # Got no data, return
         if len(data) == 0 or len(delayed_data) == 0:
@@ -148,7 +147,7 @@ class BuildingAnimationScreen(BaseExperimentScreen):
             pairs_delay = delayed_data[:, (0, 2, 4)]
 
         # Update image
-        mat = pil2rgb(self.bsa.img)
+        mat = pil2rgb(self.bsa.get_frame())
         self.image_item.setImage(mat[::-1].transpose([1, 0, 2]))
 
         # Determine if update is required
@@ -160,8 +159,7 @@ class BuildingAnimationScreen(BaseExperimentScreen):
             avg = pairs_delay[-1, 0]
             std = pairs_delay[-1, 1]
             score = self.update_animation_score(avg, std)
-            Thread(target=self.bsa.mk_frames, args=(
-                score,), daemon=True).start()
+            self.bsa.submit(self.bsa.mk_frames, score)
 
         # Set LED
         self.lcd_y.display(f'{real_y[-1]:0.2f}')
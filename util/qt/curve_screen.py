@@ -125,7 +125,7 @@ class CurveScreen(BaseExperimentScreen):
 
         # Get data
         data = self.HID_reader.peek_by_seconds(peek_length, peek_delay=False)
-        data = np.array(data)
+        data = np.asarray(data)
 
         # Got no data, return
         if len(data) == 0:
@@ -158,7 +158,7 @@ class CurveScreen(BaseExperimentScreen):
 
         # Works for blocks in their starting seconds.
         if mark in ['T', 'F', '+']:
-            block_start = self.bm.blocks[0]['start']
+            block_start = self.bm.current_start()
             block_passed = passed - block_start
             # Prevent the delay curve from displaying until rop.delayedLength is reached again.
             if block_passed < rop.delayedLength:
@@ -180,7 +180,7 @@ class CurveScreen(BaseExperimentScreen):
         # ! Using no-delayed data instead, the no-delayed data is only used in the curve screen.
         delayed_data = self.HID_reader.peek_by_seconds(
             peek_length+rop.delayedLength, peek_delay=False)
-        delayed_data = np.array(delayed_data)
+        delayed_data = np.asarray(delayed_data)
 
         delayed_data = delayed_data[delayed_data[:, 4]
                                     < passed - rop.delayedLength]
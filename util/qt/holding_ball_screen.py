@@ -228,7 +228,7 @@ class HoldingBallScreen(BaseExperimentScreen):
 
         # Get data
         data = self.HID_reader.peek_by_seconds(peek_length, peek_delay=False)
-        data = np.array(data)
+        data = np.asarray(data)
 
         # Got no data, return
         if len(data) == 0:
@@ -272,7 +272,9 @@ class HoldingBallScreen(BaseExperimentScreen):
         k = int(((y_value - ref) / ref) * 500 * 0.4)
         img = balloon.reference_img.copy()
         sz = img.size
-        img1 = balloon.animating_img.copy().resize((sz[0]-2*k, sz[1]+2*k))
+        # The resize runs on every frame, the bilinear filter is fast enough and looks the same
+        img1 = balloon.animating_img.resize(
+            (sz[0]-2*k, sz[1]+2*k), Image.BILINEAR)
         img.paste(img1, (k, -k), img1)
         # img = Image.composite(
         #     balloon.animating_img, balloon.reference_img, balloon.animating_img)
@@ -282,7 +284,7 @@ class HoldingBallScreen(BaseExperimentScreen):
         # Get delayed_data
         delayed_data = self.HID_reader.peek_by_seconds(
             peek_length, peek_delay=True)
-        delayed_data = np.array(delayed_data)
+        delayed_data = np.asarray(delayed_data)
 
         # Set delayed data
         if len(delayed_data) > 0:
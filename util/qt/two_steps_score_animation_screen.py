@@ -22,7 +22,6 @@ import numpy as np
 import pyqtgraph as pg
 
 from PySide2.QtGui import QFont
-from threading import Thread
 
 from .base_experiment_screen import BaseExperimentScreen
 
@@ -99,9 +98,6 @@ class TwoStepsScoreAnimationScreen(BaseExperimentScreen):
             self.marker_text_item.GraphicsItemFlag.ItemIgnoresTransformations
         )
         self.marker_text_item.setParentItem(self.marker_legend)
-
-        self.tssa.width = self.width()
-        self.tssa.height = self.height()
         return
 
     def draw(self):
@@ -112,12 +108,12 @@ class TwoStepsScoreAnimationScreen(BaseExperimentScreen):
 
         # Get data
         data = self.HID_reader.peek_by_seconds(peek_length, peek_delay=False)
-        data = np.array(data)
+        data = np.asarray(data)
 
         # Get delayed_data
         delayed_data = self.HID_reader.peek_by_seconds(
             peek_length, peek_delay=True)
-        delayed_data = np.array(delayed_data)
+        delayed_data = np.asarray(delayed_data)
 
         # Got no data, return
         if len(data) == 0 or len(delayed_data) == 0:
@@ -173,9 +169,7 @@ class TwoStepsScoreAnimationScreen(BaseExperimentScreen):
             self.tssa.std_threshold = rop.thresholdOfStd
             self.tssa.ref_value = rop.yReference
 
-            Thread(
-                target=self.tssa.update_score,
-                args=(pairs_delay, mark), daemon=True).start()
+            self.tssa.submit(self.tssa.update_score, pairs_delay, mark)
 
         # Set LED
         self.lcd_y.display(f'{real_y[-1]:0.2f}')